@@ -10,8 +10,10 @@ from agents.mcp import MCPServerStdio
 
 try:
     from backend import settings
+    from backend.agent_utils import agent_used_tool as _agent_used_tool
 except ImportError:  # pragma: no cover - fallback for direct script runs
     import settings
+    from agent_utils import agent_used_tool as _agent_used_tool
 
 
 def _server_params(server_path: str) -> dict[str, object]:
@@ -22,30 +24,6 @@ def _server_params(server_path: str) -> dict[str, object]:
     }
 
 
-def _agent_used_tool(result) -> bool:
-    def _scan(value) -> bool:
-        if isinstance(value, dict):
-            item_type = str(value.get("type", ""))
-            if "tool" in item_type:
-                return True
-            if "tool_name" in value or (value.get("name") and "arguments" in value):
-                return True
-            return any(_scan(v) for v in value.values())
-        if isinstance(value, (list, tuple)):
-            return any(_scan(v) for v in value)
-        item_type = getattr(value, "type", "")
-        if isinstance(item_type, str) and "tool" in item_type:
-            return True
-        if hasattr(value, "name") and hasattr(value, "arguments"):
-            return True
-        return False
-
-    for attr in ("new_items", "items", "output", "events", "trace"):
-        if _scan(getattr(result, attr, None)):
-            return True
-    return False
-
-
 async def main() -> int:
     parser = argparse.ArgumentParser(description="Run Houm MCP via Agents SDK.")
     parser.add_argument(
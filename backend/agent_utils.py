@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import operator
+from collections import deque
+from functools import lru_cache
+
+_RESULT_ATTRS = ("new_items", "items", "output", "events", "trace")
+_NAME_ARGS = operator.attrgetter("name", "arguments")
+
+
+@lru_cache(maxsize=256)
+def _class_never_matches(cls: type) -> bool:
+    """True if instances of cls can never carry the probed attributes.
+
+    Only decidable when instances have no __dict__, which requires
+    __slots__ on the class AND every base; __dictoffset__ is the
+    authoritative check. dir() already covers inherited slots.
+    """
+    if getattr(cls, "__dictoffset__", 1) != 0:
+        return False
+    return not ({"type", "name", "arguments"} & set(dir(cls)))
+
+
+def agent_used_tool(result) -> bool:
+    """Return True if an Agents SDK result contains any tool-call item.
+
+    Scans iteratively (breadth-first) instead of recursing, checking the
+    most likely attribute first and exiting on the first hit.
+    """
+    for attr in _RESULT_ATTRS:
+        value = getattr(result, attr, None)
+        if value is None:
+            continue
+        dq = deque([value])
+        while dq:
+            item = dq.popleft()
+            if isinstance(item, dict):
+                item_type = str(item.get("type", ""))
+                if "tool" in item_type:
+                    return True
+                if "tool_name" in item or (item.get("name") and "arguments" in item):
+                    return True
+                dq.extend(item.values())
+            elif isinstance(item, (list, tuple)):
+                dq.extend(item)
+            elif not _class_never_matches(type(item)):
+                item_type = getattr(item, "type", "")
+                if isinstance(item_type, str) and "tool" in item_type:
+                    return True
+                try:
+                    _NAME_ARGS(item)
+                except AttributeError:
+                    continue
+                return True
+    return False
@@ -1,26 +1,67 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 import sys
 
-import psycopg2
-import psycopg2.extras
-from fastapi import Body, FastAPI, HTTPException, Query
-from fastapi.encoders import jsonable_encoder
+import asyncpg
+import orjson
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional typed decoder
+    msgspec = None
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional SoA fast path
+    np = None
+
+try:
+    from agents import Agent, Runner
+    from agents.mcp import MCPServerStdio
+except ImportError:  # pragma: no cover - assistant requires openai-agents
+    Agent = Runner = MCPServerStdio = None
+from fastapi import Body, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import Response, StreamingResponse
 
 try:
     from backend import settings
+    from backend.agent_utils import agent_used_tool as _agent_used_tool
+    from backend.fastpath import (
+        build_prompt as _build_prompt,
+        coerce_json as _coerce_json,
+        extract_image_url as _extract_image_url,
+        normalize_name as _normalize_name,
+    )
 except ImportError:  # pragma: no cover - fallback for direct script runs
     import settings
+    from agent_utils import agent_used_tool as _agent_used_tool
+    from fastpath import (
+        build_prompt as _build_prompt,
+        coerce_json as _coerce_json,
+        extract_image_url as _extract_image_url,
+        normalize_name as _normalize_name,
+    )
 
 
 BASE_DIR = settings.BASE_DIR
 PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "").rstrip("/")
 
-app = FastAPI()
+class ORJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(
+            content,
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+
+app = FastAPI(default_response_class=ORJSONResponse)
 
 
 def _cors_origins() -> list[str]:
@@ -38,53 +79,135 @@ app.add_middleware(
 )
 
 
-def _db_connect():
+async def _init_db_conn(conn: asyncpg.Connection) -> None:
+    # asyncpg hands json/jsonb back as raw strings unless a codec is
+    # registered; the profile columns are jsonb and must round-trip as
+    # Python values like they did under psycopg2.
+    for typename in ("json", "jsonb"):
+        await conn.set_type_codec(
+            typename,
+            encoder=lambda value: orjson.dumps(value).decode(),
+            decoder=orjson.loads,
+            schema="pg_catalog",
+        )
+
+
+@app.on_event("startup")
+async def _open_db_pool() -> None:
+    app.state.pool = None
     if not settings.DATABASE_URL:
+        return
+    app.state.pool = await asyncpg.create_pool(
+        dsn=settings.DATABASE_URL,
+        min_size=settings.DB_POOL_MIN,
+        max_size=settings.DB_POOL_MAX,
+        statement_cache_size=1024,
+        init=_init_db_conn,
+    )
+
+
+@app.on_event("shutdown")
+async def _close_db_pool() -> None:
+    pool = getattr(app.state, "pool", None)
+    if pool is not None:
+        await pool.close()
+
+
+@app.on_event("shutdown")
+async def _stop_assistant_workers() -> None:
+    for task in _ASSISTANT_TASKS:
+        task.cancel()
+    if _ASSISTANT_TASKS:
+        await asyncio.gather(*_ASSISTANT_TASKS, return_exceptions=True)
+    _ASSISTANT_TASKS.clear()
+
+
+def _db_pool() -> asyncpg.Pool:
+    pool = getattr(app.state, "pool", None)
+    if pool is None:
         raise RuntimeError("Missing DATABASE_URL")
-    return psycopg2.connect(settings.DATABASE_URL)
+    return pool
 
 
-def _coerce_json(value):
-    if value is None:
-        return None
-    if isinstance(value, (dict, list)):
-        return value
-    if isinstance(value, (bytes, bytearray)):
-        try:
-            value = value.decode("utf-8")
-        except Exception:
-            return None
-    if isinstance(value, str):
-        try:
-            return json.loads(value)
-        except Exception:
-            return value
-    return value
+_FAVORITES_AGG = (
+    "COALESCE((SELECT array_agg(f.hemnet_id) FROM houm_favorites f "
+    "WHERE f.user_id = u.id), '{}') AS favorites"
+)
 
+# Everything the profile API returns; deliberately excludes name_key.
+_USER_SELECT = ", ".join(
+    f"u.{column}"
+    for column in (
+        "id",
+        "name",
+        "min_price",
+        "max_price",
+        "min_rooms",
+        "max_rooms",
+        "min_area",
+        "max_area",
+        "min_year",
+        "max_year",
+        "max_monthly_fee",
+        "housing_forms",
+        "tenure",
+        "municipalities",
+        "regions",
+        "districts",
+        "prefer_new_construction",
+        "prefer_upcoming",
+        "max_coast_distance_m",
+        "max_water_distance_m",
+        "created_at",
+        "updated_at",
+    )
+)
 
-def _normalize_name(value):
-    if not isinstance(value, str):
-        return None, None
-    display_name = value.strip()
-    if not display_name:
-        return None, None
-    return display_name, display_name.casefold()
+# Wide columns the listing API never returns directly.
+_LISTING_SKIP_COLUMNS = {
+    "main_image_bytes",
+    "floorplan_image_bytes",
+    "main_image_mime",
+    "floorplan_image_mime",
+    "geom",
+}
+_LISTING_SELECT: str | None = None
+
+# jsonpath probes for the preferred gallery formats; the quoted member is
+# the literal key name, e.g. url({"format":"ITEMGALLERY_L"}).
+_IMAGE_URL_JSONPATHS = tuple(
+    '$.images[*]."' + f'url({{"format":"{fmt}"}})'.replace('"', '\\"') + '"'
+    for fmt in ("ITEMGALLERY_L", "ITEMGALLERY_CUT", "ITEMGALLERY_M")
+)
 
 
-def _fetch_favorites(conn, user_id):
-    with conn.cursor() as cur:
-        cur.execute(
-            "SELECT hemnet_id FROM houm_favorites WHERE user_id = %s",
-            (user_id,),
+async def _listing_select(conn) -> str:
+    global _LISTING_SELECT
+    if _LISTING_SELECT is None:
+        rows = await conn.fetch(
+            """
+            SELECT column_name
+            FROM information_schema.columns
+            WHERE table_name = 'hemnet_items'
+            ORDER BY ordinal_position;
+            """
         )
-        return [row[0] for row in cur.fetchall()]
+        projected = [f"h.{row[0]}" for row in rows if row[0] not in _LISTING_SKIP_COLUMNS]
+        projected.append("(h.main_image_bytes IS NOT NULL) AS has_main_image")
+        projected.append("(h.floorplan_image_bytes IS NOT NULL) AS has_floorplan")
+        _LISTING_SELECT = ", ".join(projected)
+    return _LISTING_SELECT
 
 
 def _agent_instructions_path():
     return os.path.join(BASE_DIR, "backend", "agent_instruct.txt")
 
 
+_INSTRUCTIONS_CACHE: tuple[float, str] | None = None
+
+
 def _load_agent_instructions():
+    global _INSTRUCTIONS_CACHE
     default = (
         "You are a Houm assistant. You MUST use MCP tools before answering.\n"
         "Never invent listings. If tools return no data, say so.\n"
@@ -93,42 +216,55 @@ def _load_agent_instructions():
         "Keep responses concise and actionable."
     )
     path = _agent_instructions_path()
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return default
+    if _INSTRUCTIONS_CACHE is not None and _INSTRUCTIONS_CACHE[0] == mtime:
+        return _INSTRUCTIONS_CACHE[1] or default
     try:
         with open(path, "r", encoding="utf-8") as handle:
             content = handle.read().strip()
-    except FileNotFoundError:
-        return default
     except OSError:
         return default
+    _INSTRUCTIONS_CACHE = (mtime, content)
     return content or default
 
 
-def _build_prompt(history, message, context=None):
-    lines = []
-    if isinstance(context, dict):
-        bbox = context.get("bbox")
-        if isinstance(bbox, str) and bbox.strip():
-            lines.append(
-                "Map bbox (min_lng,min_lat,max_lng,max_lat): "
-                f"{bbox}. Use listings_by_bbox if relevant."
-            )
-    if isinstance(history, list):
-        for item in history[-6:]:
-            role = item.get("role")
-            content = item.get("content")
-            if role not in ("user", "assistant"):
-                continue
-            if not isinstance(content, str):
-                continue
-            lines.append(f"{role.title()}: {content.strip()}")
-    lines.append(f"User: {message}")
-    lines.append("Assistant:")
-    return "\n".join(lines)
+if msgspec is not None:
+
+    class _AssistantNote(msgspec.Struct):
+        pros: list[str] = []
+        cons: list[str] = []
+
+    class _AssistantReply(msgspec.Struct):
+        message: str = ""
+        reply: str = ""
+        recommended_ids: list[int] = []
+        recommendation_notes: dict[int, _AssistantNote] = {}
+        tools_used: list[str] = []
+
+    _ASSISTANT_DECODER = msgspec.json.Decoder(_AssistantReply, strict=False)
 
 
 def _parse_assistant_output(reply: str):
     if not reply:
         return "", [], {}, []
+    if msgspec is None:
+        return _parse_assistant_output_fallback(reply)
+    try:
+        payload = _ASSISTANT_DECODER.decode(reply.encode("utf-8"))
+    except (msgspec.DecodeError, msgspec.ValidationError):
+        return reply, [], {}, []
+    message = payload.message or payload.reply
+    notes = {
+        hemnet_id: {"pros": note.pros, "cons": note.cons}
+        for hemnet_id, note in payload.recommendation_notes.items()
+    }
+    return message or reply, payload.recommended_ids, notes, payload.tools_used
+
+
+def _parse_assistant_output_fallback(reply: str):
     try:
         payload = json.loads(reply)
     except Exception:
@@ -174,96 +310,153 @@ def _parse_assistant_output(reply: str):
     return message or reply, recommended_ids, recommendation_notes, tools_used
 
 
-def _agent_used_tool(result) -> bool:
-    def _scan(value) -> bool:
-        if isinstance(value, dict):
-            item_type = str(value.get("type", ""))
-            if "tool" in item_type:
-                return True
-            if "tool_name" in value or (value.get("name") and "arguments" in value):
-                return True
-            return any(_scan(v) for v in value.values())
-        if isinstance(value, (list, tuple)):
-            return any(_scan(v) for v in value)
-        item_type = getattr(value, "type", "")
-        if isinstance(item_type, str) and "tool" in item_type:
-            return True
-        if hasattr(value, "name") and hasattr(value, "arguments"):
-            return True
-        return False
-
-    for attr in ("new_items", "items", "output", "events", "trace"):
-        if _scan(getattr(result, attr, None)):
-            return True
-    return False
-
-
-async def _run_agent(prompt: str) -> str:
-    from agents import Agent, Runner
-    from agents.mcp import MCPServerStdio
+ASSISTANT_WORKERS = int(os.getenv("HOUM_ASSISTANT_WORKERS", "2"))
+ASSISTANT_TIMEOUT = float(os.getenv("HOUM_ASSISTANT_TIMEOUT", "120"))
+
+_ASSISTANT_LOCK = asyncio.Lock()
+_ASSISTANT_QUEUE: asyncio.Queue | None = None
+_ASSISTANT_TASKS: list[asyncio.Task] = []
+
+
+def _build_agent(instructions: str, mcp_server):
+    try:
+        return Agent(
+            name="SearchAgent",
+            instructions=instructions,
+            mcp_servers=[mcp_server],
+        )
+    except TypeError:
+        return Agent(
+            name="SearchAgent",
+            instructions=instructions,
+        )
 
+
+async def _ensure_assistant_workers() -> asyncio.Queue:
+    global _ASSISTANT_QUEUE
+    if _ASSISTANT_QUEUE is not None:
+        return _ASSISTANT_QUEUE
+    async with _ASSISTANT_LOCK:
+        if _ASSISTANT_QUEUE is not None:
+            return _ASSISTANT_QUEUE
+        queue: asyncio.Queue = asyncio.Queue()
+        for _ in range(max(1, ASSISTANT_WORKERS)):
+            _ASSISTANT_TASKS.append(asyncio.create_task(_assistant_worker(queue)))
+        _ASSISTANT_QUEUE = queue
+    return _ASSISTANT_QUEUE
+
+
+def _fail_assistant_workers(queue: asyncio.Queue, exc: Exception) -> None:
+    """Fail queued jobs and reset state so the next request respawns workers."""
+    global _ASSISTANT_QUEUE
+    if _ASSISTANT_QUEUE is queue:
+        _ASSISTANT_QUEUE = None
+        for task in _ASSISTANT_TASKS:
+            task.cancel()
+        _ASSISTANT_TASKS.clear()
+    while True:
+        try:
+            _, _, future = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        if not future.done():
+            future.set_exception(RuntimeError(f"assistant worker failed: {exc}"))
+        queue.task_done()
+
+
+async def _assistant_worker(queue: asyncio.Queue) -> None:
+    """Drain assistant jobs against one long-lived MCP server subprocess."""
     server_path = os.path.join(BASE_DIR, "backend", "server.py")
-    async with MCPServerStdio(
-        name="houm_mcp",
-        params={
-            "command": sys.executable,
-            "args": [server_path],
-            "env": dict(os.environ),
-        },
-    ) as mcp_server:
+    try:
+        async with MCPServerStdio(
+            name="houm_mcp",
+            params={
+                "command": sys.executable,
+                "args": [server_path],
+                "env": dict(os.environ),
+            },
+        ) as mcp_server:
+            cached: tuple[str, object] | None = None
+            while True:
+                prompt, instructions, future = await queue.get()
+                try:
+                    if future.cancelled():
+                        continue
+                    if cached is None or cached[0] != instructions:
+                        cached = (instructions, _build_agent(instructions, mcp_server))
+                    result = await _run_agent_once(cached[1], prompt, mcp_server)
+                    if not future.done():
+                        future.set_result(result)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    if not future.done():
+                        future.set_exception(exc)
+                finally:
+                    queue.task_done()
+    except asyncio.CancelledError:
+        raise
+    except Exception as exc:
+        # The MCP subprocess failed to start (or its transport died).
+        # Without this, queued futures pend forever and every later
+        # request enqueues onto a queue nobody is draining.
+        _fail_assistant_workers(queue, exc)
+
+
+async def _run_agent_once(agent, prompt: str, mcp_server) -> str:
+    try:
+        result = await Runner.run(
+            agent,
+            prompt,
+            tool_choice="required",
+            mcp_servers=[mcp_server],
+        )
+    except TypeError:
         try:
-            agent = Agent(
-                name="SearchAgent",
-                instructions=_load_agent_instructions(),
-                mcp_servers=[mcp_server],
-            )
+            result = await Runner.run(agent, prompt, mcp_servers=[mcp_server])
         except TypeError:
-            agent = Agent(
-                name="SearchAgent",
-                instructions=_load_agent_instructions(),
-            )
+            result = await Runner.run(agent, prompt)
+    if not _agent_used_tool(result):
+        forced_prompt = (
+            prompt
+            + "\n\nIMPORTANT: You must call at least one MCP tool before "
+            "answering. If you cannot, reply with: TOOL_UNAVAILABLE."
+        )
         try:
             result = await Runner.run(
                 agent,
-                prompt,
+                forced_prompt,
                 tool_choice="required",
                 mcp_servers=[mcp_server],
             )
         except TypeError:
-            try:
-                result = await Runner.run(agent, prompt, mcp_servers=[mcp_server])
-            except TypeError:
-                result = await Runner.run(agent, prompt)
-        if not _agent_used_tool(result):
-            forced_prompt = (
-                prompt
-                + "\n\nIMPORTANT: You must call at least one MCP tool before "
-                "answering. If you cannot, reply with: TOOL_UNAVAILABLE."
-            )
             try:
                 result = await Runner.run(
                     agent,
                     forced_prompt,
-                    tool_choice="required",
                     mcp_servers=[mcp_server],
                 )
             except TypeError:
-                try:
-                    result = await Runner.run(
-                        agent,
-                        forced_prompt,
-                        mcp_servers=[mcp_server],
-                    )
-                except TypeError:
-                    result = await Runner.run(agent, forced_prompt)
-            if not _agent_used_tool(result):
-                return (
-                    "I could not access verified tool data. "
-                    "Please try again once the MCP tools are available."
-                )
+                result = await Runner.run(agent, forced_prompt)
+        if not _agent_used_tool(result):
+            return (
+                "I could not access verified tool data. "
+                "Please try again once the MCP tools are available."
+            )
     return result.final_output or ""
 
 
+async def _run_agent(prompt: str, instructions: str | None = None) -> str:
+    if Agent is None:
+        raise RuntimeError("openai-agents is not installed")
+    if instructions is None:
+        instructions = _load_agent_instructions()
+    queue = await _ensure_assistant_workers()
+    future = asyncio.get_running_loop().create_future()
+    await queue.put((prompt, instructions, future))
+    return await asyncio.wait_for(future, timeout=ASSISTANT_TIMEOUT)
+
+
 def _absolute_path(path: str) -> str:
     if not PUBLIC_BASE_URL:
         return path
@@ -272,27 +465,17 @@ def _absolute_path(path: str) -> str:
     return f"{PUBLIC_BASE_URL}{path}"
 
 
-def _extract_image_url(image):
-    if not isinstance(image, dict):
-        return None
-    preferred = ["ITEMGALLERY_L", "ITEMGALLERY_CUT", "ITEMGALLERY_M"]
-    for fmt in preferred:
-        key = f'url({{"format":"{fmt}"}})'
-        if key in image and isinstance(image[key], str):
-            return image[key]
-    for key, value in image.items():
-        if key.startswith("url(") and isinstance(value, str):
-            return value
-    return None
-
-
 def _select_image_url(listing):
-    if listing.get("main_image_bytes"):
+    if listing.get("has_main_image") or listing.get("main_image_bytes"):
         return _absolute_path(f"/api/listings/{listing['hemnet_id']}/image/main")
 
     if listing.get("main_image_url"):
         return listing.get("main_image_url")
 
+    url = listing.get("img_l") or listing.get("img_cut") or listing.get("img_m")
+    if url:
+        return url
+
     images = _coerce_json(listing.get("images"))
     if isinstance(images, dict):
         for image in images.get("images", []) or []:
@@ -312,7 +495,7 @@ def _select_image_url(listing):
 def get_config():
     key = settings.GOOGLE_MAPS_API_KEY
     status = 200 if key else 500
-    return JSONResponse(
+    return ORJSONResponse(
         {"googleMapsApiKey": key},
         status_code=status,
         headers={"Cache-Control": "no-store"},
@@ -320,7 +503,7 @@ def get_config():
 
 
 @app.get("/api/listings/points")
-def listings_points(bbox: str = Query("")):
+async def listings_points(bbox: str = Query("")):
     try:
         min_lng, min_lat, max_lng, max_lat = [float(v) for v in bbox.split(",")]
     except Exception:
@@ -329,50 +512,55 @@ def listings_points(bbox: str = Query("")):
     sql = """
         SELECT h.hemnet_id, h.latitude AS lat, h.longitude AS lng
         FROM hemnet_items h
-        WHERE h.latitude IS NOT NULL
-          AND h.longitude IS NOT NULL
-          AND h.longitude BETWEEN %s AND %s
-          AND h.latitude BETWEEN %s AND %s
+        WHERE h.geom && ST_MakeEnvelope($1, $2, $3, $4, 4326)
+        ORDER BY h.hemnet_id
         LIMIT 2000;
     """
-    with _db_connect() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(sql, (min_lng, max_lng, min_lat, max_lat))
-            rows = cur.fetchall()
-
-    points = [
-        {"hemnet_id": row["hemnet_id"], "lat": row["lat"], "lng": row["lng"]}
-        for row in rows
-        if row.get("hemnet_id") is not None
-    ]
-    return {"points": points, "count": len(points)}
+    async with _db_pool().acquire() as conn:
+        rows = await conn.fetch(sql, min_lng, min_lat, max_lng, max_lat)
+
+    # Columnar (struct-of-arrays) payload: orjson serializes the NumPy
+    # arrays natively via OPT_SERIALIZE_NUMPY, skipping per-point dicts.
+    count = len(rows)
+    if np is not None:
+        ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=count)
+        lats = np.fromiter((r[1] for r in rows), dtype=np.float64, count=count)
+        lngs = np.fromiter((r[2] for r in rows), dtype=np.float64, count=count)
+    else:
+        ids = [r[0] for r in rows]
+        lats = [r[1] for r in rows]
+        lngs = [r[2] for r in rows]
+    # Return the Response directly: bare dicts go through FastAPI's
+    # jsonable_encoder first, which chokes on ndarrays before orjson
+    # ever sees them.
+    return ORJSONResponse({"hemnet_id": ids, "lat": lats, "lng": lngs, "count": count})
 
 
 @app.get("/api/profile")
-def profile_get(name: str = Query("")):
+async def profile_get(name: str = Query("")):
     display_name, name_key = _normalize_name(name)
     if not display_name:
         raise HTTPException(status_code=400, detail="missing_name")
 
-    sql = "SELECT * FROM houm_users WHERE name_key = %s LIMIT 1;"
-    with _db_connect() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(sql, (name_key,))
-            row = cur.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="not_found")
-        favorites = _fetch_favorites(conn, row["id"])
+    sql = (
+        f"SELECT {_USER_SELECT}, {_FAVORITES_AGG} "
+        "FROM houm_users u WHERE u.name_key = $1 LIMIT 1;"
+    )
+    async with _db_pool().acquire() as conn:
+        row = await conn.fetchrow(sql, name_key)
+    if not row:
+        raise HTTPException(status_code=404, detail="not_found")
 
-    row.pop("name_key", None)
-    row["favorites"] = favorites
-    return JSONResponse(
-        jsonable_encoder(row),
+    row = dict(row)
+    row["favorites"] = list(row["favorites"])
+    return ORJSONResponse(
+        row,
         headers={"Cache-Control": "no-store"},
     )
 
 
 @app.post("/api/profile")
-def profile_upsert(payload: dict = Body(default=None)):
+async def profile_upsert(payload: dict = Body(default=None)):
     payload = payload or {}
     display_name, name_key = _normalize_name(payload.get("name", ""))
     if not display_name:
@@ -402,86 +590,76 @@ def profile_upsert(payload: dict = Body(default=None)):
         "max_coast_distance_m": "max_coast_distance_m",
         "max_water_distance_m": "max_water_distance_m",
     }
-    json_columns = {
-        "housing_forms",
-        "tenure",
-        "municipalities",
-        "regions",
-        "districts",
-    }
-
-    with _db_connect() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(
-                """
-                INSERT INTO houm_users (name, name_key)
-                VALUES (%s, %s)
+    async with _db_pool().acquire() as conn:
+        row = await conn.fetchrow(
+            f"""
+            WITH u AS (
+                INSERT INTO houm_users (name)
+                VALUES ($1)
                 ON CONFLICT (name_key)
                 DO UPDATE SET name = EXCLUDED.name, updated_at = NOW()
-                RETURNING *;
-                """,
-                (display_name, name_key),
+                RETURNING *
             )
-            row = cur.fetchone()
-
-            updates = []
-            values = []
-            for key, column in preference_map.items():
-                if key not in preferences:
-                    continue
-                value = preferences[key]
-                if column in json_columns:
-                    value = psycopg2.extras.Json(value)
-                updates.append(f"{column} = %s")
-                values.append(value)
-
-            if updates:
-                updates.append("updated_at = NOW()")
-                values.append(row["id"])
-                cur.execute(
-                    f"""
+            SELECT {_USER_SELECT}, {_FAVORITES_AGG} FROM u;
+            """,
+            display_name,
+        )
+
+        updates = []
+        values = [row["id"]]
+        for key, column in preference_map.items():
+            if key not in preferences:
+                continue
+            # jsonb columns take the Python list/dict as-is; the codec
+            # registered at connection init does the encoding. Pre-dumping
+            # here would double-encode and persist jsonb strings.
+            updates.append(f"{column} = ${len(values) + 1}")
+            values.append(preferences[key])
+
+        if updates:
+            updates.append("updated_at = NOW()")
+            row = await conn.fetchrow(
+                f"""
+                WITH u AS (
                     UPDATE houm_users
                     SET {", ".join(updates)}
-                    WHERE id = %s
-                    RETURNING *;
-                    """,
-                    values,
+                    WHERE id = $1
+                    RETURNING *
                 )
-                row = cur.fetchone()
-
-        favorites = _fetch_favorites(conn, row["id"])
+                SELECT {_USER_SELECT}, {_FAVORITES_AGG} FROM u;
+                """,
+                *values,
+            )
 
-    row.pop("name_key", None)
-    row["favorites"] = favorites
-    return JSONResponse(
-        jsonable_encoder(row),
+    row = dict(row)
+    row["favorites"] = list(row["favorites"])
+    return ORJSONResponse(
+        row,
         headers={"Cache-Control": "no-store"},
     )
 
 
 @app.get("/api/favorites")
-def favorites_get(name: str = Query("")):
+async def favorites_get(name: str = Query("")):
     display_name, name_key = _normalize_name(name)
     if not display_name:
         raise HTTPException(status_code=400, detail="missing_name")
 
-    sql = "SELECT id FROM houm_users WHERE name_key = %s LIMIT 1;"
-    with _db_connect() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, (name_key,))
-            row = cur.fetchone()
-            if not row:
-                raise HTTPException(status_code=404, detail="not_found")
-            favorites = _fetch_favorites(conn, row[0])
+    sql = f"SELECT u.id, {_FAVORITES_AGG} FROM houm_users u WHERE u.name_key = $1 LIMIT 1;"
+    async with _db_pool().acquire() as conn:
+        row = await conn.fetchrow(sql, name_key)
+    if not row:
+        raise HTTPException(status_code=404, detail="not_found")
+    favorites = list(row["favorites"])
 
-    return JSONResponse(
+    return ORJSONResponse(
         {"name": display_name, "favorites": favorites},
         headers={"Cache-Control": "no-store"},
     )
 
 
 @app.post("/api/favorites")
-def favorites_add(payload: dict = Body(default=None)):
+async def favorites_add(payload: dict = Body(default=None)):
     payload = payload or {}
     display_name, name_key = _normalize_name(payload.get("name", ""))
     hemnet_id = payload.get("hemnet_id")
@@ -493,37 +671,42 @@ def favorites_add(payload: dict = Body(default=None)):
         except Exception:
             raise HTTPException(status_code=400, detail="invalid_hemnet_id")
 
-    with _db_connect() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO houm_users (name, name_key)
-                VALUES (%s, %s)
-                ON CONFLICT (name_key)
-                DO UPDATE SET name = EXCLUDED.name, updated_at = NOW()
-                RETURNING id;
-                """,
-                (display_name, name_key),
-            )
-            user_id = cur.fetchone()[0]
-            cur.execute(
-                """
+    async with _db_pool().acquire() as conn:
+        user_id = await conn.fetchval(
+            """
+            INSERT INTO houm_users (name)
+            VALUES ($1)
+            ON CONFLICT (name_key)
+            DO UPDATE SET name = EXCLUDED.name, updated_at = NOW()
+            RETURNING id;
+            """,
+            display_name,
+        )
+        rows = await conn.fetch(
+            """
+            WITH ins AS (
                 INSERT INTO houm_favorites (user_id, hemnet_id)
-                VALUES (%s, %s)
-                ON CONFLICT DO NOTHING;
-                """,
-                (user_id, hemnet_id),
+                VALUES ($1, $2)
+                ON CONFLICT DO NOTHING
+                RETURNING hemnet_id
             )
-            favorites = _fetch_favorites(conn, user_id)
+            SELECT hemnet_id FROM houm_favorites WHERE user_id = $1
+            UNION
+            SELECT hemnet_id FROM ins;
+            """,
+            user_id,
+            hemnet_id,
+        )
+        favorites = [r[0] for r in rows]
 
-    return JSONResponse(
+    return ORJSONResponse(
         {"name": display_name, "favorites": favorites},
         headers={"Cache-Control": "no-store"},
     )
 
 
 @app.delete("/api/favorites")
-def favorites_remove(payload: dict = Body(default=None)):
+async def favorites_remove(payload: dict = Body(default=None)):
     payload = payload or {}
     display_name, name_key = _normalize_name(payload.get("name", ""))
     hemnet_id = payload.get("hemnet_id")
@@ -535,23 +718,30 @@ def favorites_remove(payload: dict = Body(default=None)):
         except Exception:
             raise HTTPException(status_code=400, detail="invalid_hemnet_id")
 
-    with _db_connect() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT id FROM houm_users WHERE name_key = %s LIMIT 1;",
-                (name_key,),
-            )
-            row = cur.fetchone()
-            if not row:
-                raise HTTPException(status_code=404, detail="not_found")
-            user_id = row[0]
-            cur.execute(
-                "DELETE FROM houm_favorites WHERE user_id = %s AND hemnet_id = %s;",
-                (user_id, hemnet_id),
+    async with _db_pool().acquire() as conn:
+        user_id = await conn.fetchval(
+            "SELECT id FROM houm_users WHERE name_key = $1 LIMIT 1;",
+            name_key,
+        )
+        if user_id is None:
+            raise HTTPException(status_code=404, detail="not_found")
+        rows = await conn.fetch(
+            """
+            WITH del AS (
+                DELETE FROM houm_favorites
+                WHERE user_id = $1 AND hemnet_id = $2
+                RETURNING hemnet_id
             )
-            favorites = _fetch_favorites(conn, user_id)
+            SELECT hemnet_id FROM houm_favorites WHERE user_id = $1
+            EXCEPT
+            SELECT hemnet_id FROM del;
+            """,
+            user_id,
+            hemnet_id,
+        )
+        favorites = [r[0] for r in rows]
 
-    return JSONResponse(
+    return ORJSONResponse(
         {"name": display_name, "favorites": favorites},
         headers={"Cache-Control": "no-store"},
     )
@@ -570,13 +760,13 @@ async def assistant(payload: dict = Body(default=None)):
 
     prompt = _build_prompt(history, message.strip(), context)
     try:
-        reply = await _run_agent(prompt)
+        reply = await _run_agent(prompt, _load_agent_instructions())
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"assistant_failed: {exc}") from exc
     reply_text, recommended_ids, recommendation_notes, tools_used = _parse_assistant_output(reply)
     if tools_used:
         print(f"[assistant] tools_used={tools_used}", file=sys.stderr, flush=True)
-    return JSONResponse(
+    return ORJSONResponse(
         {
             "reply": reply_text,
             "recommended_ids": recommended_ids,
@@ -587,28 +777,48 @@ async def assistant(payload: dict = Body(default=None)):
     )
 
 
+def _listing_etag(hemnet_id: str, row) -> str | None:
+    stamp = row.get("updated_at") or row.get("collected_at")
+    if stamp is None:
+        return None
+    try:
+        stamp = stamp.timestamp()
+    except AttributeError:
+        pass
+    return f'W/"{hemnet_id}-{stamp}"'
+
+
 @app.get("/api/listings/{hemnet_id}")
-def listing_get(hemnet_id: str):
+async def listing_get(hemnet_id: str, request: Request):
     if not hemnet_id.isdigit():
         raise HTTPException(status_code=400, detail="invalid_id")
 
-    sql = """
-        SELECT h.*,
-               COALESCE(h.latitude, c.lattitude) AS lat,
-               COALESCE(h.longitude, c.longitude) AS lng
-        FROM hemnet_items h
-        LEFT JOIN hemnet_comp_items c ON c.hemnet_id = h.hemnet_id
-        WHERE h.hemnet_id = %s
-        LIMIT 1;
-    """
-    with _db_connect() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(sql, (hemnet_id,))
-            row = cur.fetchone()
+    async with _db_pool().acquire() as conn:
+        columns = await _listing_select(conn)
+        sql = f"""
+            SELECT {columns},
+                   COALESCE(h.latitude, c.lattitude) AS lat,
+                   COALESCE(h.longitude, c.longitude) AS lng,
+                   jsonb_path_query_first(h.images, $2::jsonpath) #>> '{{}}' AS img_l,
+                   jsonb_path_query_first(h.images, $3::jsonpath) #>> '{{}}' AS img_cut,
+                   jsonb_path_query_first(h.images, $4::jsonpath) #>> '{{}}' AS img_m
+            FROM hemnet_items h
+            LEFT JOIN hemnet_comp_items c ON c.hemnet_id = h.hemnet_id
+            WHERE h.hemnet_id = $1
+            LIMIT 1;
+        """
+        row = await conn.fetchrow(sql, int(hemnet_id), *_IMAGE_URL_JSONPATHS)
 
     if not row:
         raise HTTPException(status_code=404, detail="not_found")
 
+    row = dict(row)
+    etag = _listing_etag(hemnet_id, row)
+    cache_headers = {"Cache-Control": "private, max-age=60, must-revalidate"}
+    if etag:
+        cache_headers["ETag"] = etag
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=cache_headers)
     for key in [
         "districts",
         "labels",
@@ -639,30 +849,31 @@ def listing_get(hemnet_id: str):
         row[key] = _coerce_json(row.get(key))
 
     row["image_url"] = _select_image_url(row)
-    if row.get("floorplan_image_bytes"):
+    for key in ("img_l", "img_cut", "img_m"):
+        row.pop(key, None)
+    if row.get("has_floorplan"):
         row["floorplan_image_url"] = _absolute_path(
             f"/api/listings/{row['hemnet_id']}/image/floorplan"
         )
     else:
         row["floorplan_image_url"] = None
-    row.pop("main_image_bytes", None)
-    row.pop("floorplan_image_bytes", None)
-    row.pop("main_image_mime", None)
-    row.pop("floorplan_image_mime", None)
 
-    return JSONResponse(
-        jsonable_encoder(row),
-        headers={"Cache-Control": "no-store"},
-    )
+    return ORJSONResponse(row, headers=cache_headers)
 
 
 @app.get("/api/listings/{hemnet_id}/image")
-def listing_image_default(hemnet_id: str):
-    return listing_image(hemnet_id, "main")
+async def listing_image_default(hemnet_id: str, request: Request):
+    return await listing_image(hemnet_id, "main", request)
+
+
+def _iter_chunks(data: bytes, chunk_size: int = 64 * 1024):
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start : start + chunk_size])
 
 
 @app.get("/api/listings/{hemnet_id}/image/{image_type}")
-def listing_image(hemnet_id: str, image_type: str):
+async def listing_image(hemnet_id: str, image_type: str, request: Request):
     if not hemnet_id.isdigit():
         raise HTTPException(status_code=400, detail="invalid_id")
 
@@ -670,22 +881,39 @@ def listing_image(hemnet_id: str, image_type: str):
         raise HTTPException(status_code=404, detail="not_found")
 
     if image_type == "main":
-        columns = "main_image_bytes, main_image_mime"
+        column, mime_column = "main_image_bytes", "main_image_mime"
     else:
-        columns = "floorplan_image_bytes, floorplan_image_mime"
+        column, mime_column = "floorplan_image_bytes", "floorplan_image_mime"
 
-    sql = f"SELECT {columns} FROM hemnet_items WHERE hemnet_id = %s LIMIT 1;"
-    with _db_connect() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, (hemnet_id,))
-            row = cur.fetchone()
+    cache_control = "public, max-age=86400"
+    async with _db_pool().acquire() as conn:
+        etag = await conn.fetchval(
+            f"SELECT md5({column}) FROM hemnet_items WHERE hemnet_id = $1 LIMIT 1;",
+            int(hemnet_id),
+        )
+        if etag is None:
+            raise HTTPException(status_code=404, detail="not_found")
+        etag = f'"{etag}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(
+                status_code=304,
+                headers={"ETag": etag, "Cache-Control": cache_control},
+            )
+        row = await conn.fetchrow(
+            f"SELECT {column}, {mime_column} FROM hemnet_items WHERE hemnet_id = $1 LIMIT 1;",
+            int(hemnet_id),
+        )
 
     if not row or not row[0]:
         raise HTTPException(status_code=404, detail="not_found")
 
-    data, content_type = row
-    return Response(
-        content=data,
+    data, content_type = row[0], row[1]
+    return StreamingResponse(
+        _iter_chunks(data),
         media_type=content_type or "image/jpeg",
-        headers={"Cache-Control": "public, max-age=86400"},
+        headers={
+            "ETag": etag,
+            "Cache-Control": cache_control,
+            "Content-Length": str(len(data)),
+        },
     )
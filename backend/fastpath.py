@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import sys
+from functools import lru_cache
+from typing import Any
+
+import orjson
+
+# Fully annotated, framework-free hot-path helpers. The module runs as
+# plain Python but can also be compiled ahead of time with mypyc
+# (`mypyc backend/fastpath.py`) for a native-code speedup.
+
+_PREFERRED_IMAGE_FORMATS: tuple[str, ...] = (
+    "ITEMGALLERY_L",
+    "ITEMGALLERY_CUT",
+    "ITEMGALLERY_M",
+)
+
+
+@lru_cache(maxsize=1024)
+def _normalize_name_cached(value: str) -> tuple[str | None, str | None]:
+    display_name = value.strip()
+    if not display_name:
+        return None, None
+    # lower(), not casefold(): the key must match houm_users.name_key,
+    # which is generated in SQL as lower(btrim(name)).
+    return display_name, sys.intern(display_name.lower())
+
+
+def normalize_name(value: object) -> tuple[str | None, str | None]:
+    if not isinstance(value, str):
+        return None, None
+    return _normalize_name_cached(value)
+
+
+def build_prompt(history: object, message: str, context: object = None) -> str:
+    lines: list[str] = []
+    if isinstance(context, dict):
+        bbox = context.get("bbox")
+        if isinstance(bbox, str) and bbox.strip():
+            lines.append(
+                "Map bbox (min_lng,min_lat,max_lng,max_lat): "
+                f"{bbox}. Use listings_by_bbox if relevant."
+            )
+    if isinstance(history, list):
+        for item in history[-6:]:
+            if not isinstance(item, dict):
+                continue
+            role = item.get("role")
+            content = item.get("content")
+            if role not in ("user", "assistant"):
+                continue
+            if not isinstance(content, str):
+                continue
+            lines.append(f"{role.title()}: {content.strip()}")
+    lines.append(f"User: {message}")
+    lines.append("Assistant:")
+    return "\n".join(lines)
+
+
+def coerce_json(value: object) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return value
+    if isinstance(value, (str, bytes, bytearray)):
+        try:
+            return orjson.loads(value)
+        except Exception:
+            return value if isinstance(value, str) else None
+    return value
+
+
+def extract_image_url(image: object) -> str | None:
+    if not isinstance(image, dict):
+        return None
+    for fmt in _PREFERRED_IMAGE_FORMATS:
+        key = f'url({{"format":"{fmt}"}})'
+        value = image.get(key)
+        if isinstance(value, str):
+            return value
+    for key, value in image.items():
+        if key.startswith("url(") and isinstance(value, str):
+            return value
+    return None
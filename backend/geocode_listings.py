@@ -1,14 +1,13 @@
 from __future__ import annotations
 
 import argparse
-import json
+import asyncio
 import os
+import re
 import time
-import urllib.parse
-import urllib.request
 
-import psycopg2
-import psycopg2.extras
+import asyncpg
+import httpx
 
 try:
     from backend import settings
@@ -16,29 +15,55 @@ except ImportError:  # pragma: no cover - fallback for direct script runs
     import settings
 
 
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
 
-def _ensure_columns(conn) -> None:
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            ALTER TABLE hemnet_items
-            ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION,
-            ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
-            """
-        )
-    conn.commit()
 
+async def _ensure_columns(conn: asyncpg.Connection) -> None:
+    await conn.execute(
+        """
+        ALTER TABLE hemnet_items
+        ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION,
+        ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
+        """
+    )
+    # Partial index so the candidate SELECT walks only the unresolved tail
+    # instead of seq-scanning a mostly geocoded table.
+    await conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS hemnet_items_ungeocoded_idx
+        ON hemnet_items (hemnet_id)
+        WHERE latitude IS NULL OR longitude IS NULL;
+        """
+    )
+
+
+async def _ensure_cache_table(conn: asyncpg.Connection) -> None:
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS geocode_cache (
+            address_norm TEXT PRIMARY KEY,
+            lat DOUBLE PRECISION,
+            lng DOUBLE PRECISION,
+            status TEXT,
+            cached_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        """
+    )
+
+
+_NORM_STRIP_RE = re.compile(r"[^\w\s]", re.UNICODE)
+_NORM_SPACE_RE = re.compile(r"\s+")
+
+
+def _normalize_address(address: str) -> str:
+    """Cache key: lowercase, punctuation stripped, whitespace collapsed."""
+    norm = _NORM_STRIP_RE.sub(" ", address.lower())
+    return _NORM_SPACE_RE.sub(" ", norm).strip()
 
-def _build_address(row: dict) -> str:
+
+def _build_address(row) -> str:
     parts = []
-    for key in (
-        "address",
-        "post_code",
-        "municipality_name",
-        "region_name",
-        "county_name",
-        "geographic_area",
-    ):
+    for key in ("address", "municipality_name"):
         value = row.get(key)
         if value:
             value = str(value).strip()
@@ -57,12 +82,46 @@ def _build_address(row: dict) -> str:
     return ", ".join(unique_parts)
 
 
-def _geocode(address: str, api_key: str) -> tuple[float | None, float | None, str]:
-    params = urllib.parse.urlencode({"address": address, "key": api_key})
-    url = f"https://maps.googleapis.com/maps/api/geocode/json?{params}"
-    req = urllib.request.Request(url, headers={"User-Agent": "HoumGeocoder/1.0"})
-    with urllib.request.urlopen(req, timeout=20) as resp:
-        payload = json.loads(resp.read().decode("utf-8"))
+def _build_components(row) -> str:
+    """Structured filters; they beat stuffing every field into the address."""
+    parts = ["country:SE"]
+    post_code = str(row.get("post_code") or "").strip()
+    if post_code:
+        parts.append(f"postal_code:{post_code}")
+    municipality = str(row.get("municipality_name") or "").strip()
+    if municipality:
+        parts.append(f"locality:{municipality}")
+    return "|".join(parts)
+
+
+class _RateLimiter:
+    """Space request starts by a fixed interval across concurrent tasks."""
+
+    def __init__(self, interval: float) -> None:
+        self._interval = max(0.0, interval)
+        self._lock = asyncio.Lock()
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        if not self._interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self._interval
+        delay = start - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _geocode(
+    client: httpx.AsyncClient, address: str, components: str, api_key: str
+) -> tuple[float | None, float | None, str]:
+    params = {"address": address, "key": api_key}
+    if components:
+        params["components"] = components
+    resp = await client.get(GEOCODE_URL, params=params, timeout=20)
+    payload = resp.json()
 
     status = payload.get("status", "UNKNOWN_ERROR")
     if status != "OK":
@@ -76,24 +135,25 @@ def _geocode(address: str, api_key: str) -> tuple[float | None, float | None, st
     return location.get("lat"), location.get("lng"), status
 
 
-def main() -> int:
-    parser = argparse.ArgumentParser(
-        description="Backfill hemnet_items latitude/longitude via Google Geocoding."
+async def _flush_updates(
+    conn: asyncpg.Connection, buffer: list[tuple[int, float, float]]
+) -> int:
+    """Apply buffered (hemnet_id, lat, lng) rows in one pipelined batch."""
+    await conn.executemany(
+        """
+        UPDATE hemnet_items
+        SET latitude = $2,
+            longitude = $3
+        WHERE hemnet_id = $1;
+        """,
+        buffer,
     )
-    parser.add_argument("--limit", type=int, default=100, help="Max rows to geocode.")
-    parser.add_argument(
-        "--sleep",
-        type=float,
-        default=0.2,
-        help="Seconds to sleep between requests.",
-    )
-    parser.add_argument(
-        "--dry-run",
-        action="store_true",
-        help="Log geocoding results without writing to the database.",
-    )
-    args = parser.parse_args()
+    count = len(buffer)
+    buffer.clear()
+    return count
 
+
+async def _run(args: argparse.Namespace) -> int:
     api_key = os.getenv("GOOGLE_GEOCODING_API_KEY") or settings.GOOGLE_MAPS_API_KEY
     if not api_key:
         print("Missing GOOGLE_GEOCODING_API_KEY or GOOGLE_MAPS_API_KEY.")
@@ -103,69 +163,186 @@ def main() -> int:
         print("Missing DATABASE_URL.")
         return 1
 
-    with psycopg2.connect(settings.DATABASE_URL) as conn:
-        _ensure_columns(conn)
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(
-                """
-                SELECT hemnet_id,
-                       address,
-                       post_code,
-                       municipality_name,
-                       region_name,
-                       county_name,
-                       geographic_area
-                FROM hemnet_items
-                WHERE (latitude IS NULL OR longitude IS NULL)
-                  AND NULLIF(TRIM(COALESCE(address, '')), '') IS NOT NULL
-                ORDER BY hemnet_id
-                LIMIT %s;
-                """,
-                (args.limit,),
-            )
-            rows = cur.fetchall()
-
-        if not rows:
-            print("No rows to geocode.")
-            return 0
+    pool = await asyncpg.create_pool(settings.DATABASE_URL, min_size=1, max_size=4)
+    try:
+        async with pool.acquire() as conn:
+            await _ensure_columns(conn)
+            await _ensure_cache_table(conn)
 
+        limiter = _RateLimiter(args.sleep)
+        sem = asyncio.Semaphore(max(1, args.concurrency))
+        cached: dict[str, tuple[float | None, float | None, str]] = {}
+        new_cache: dict[str, tuple[float | None, float | None, str]] = {}
+        buffer: list[tuple[int, float, float]] = []
+        seen_rows = False
         updated = 0
-        with conn.cursor() as cur:
-            for row in rows:
-                address = _build_address(row)
-                if not address:
-                    continue
-
-                lat, lng, status = _geocode(address, api_key)
-                if status != "OK":
-                    print(
-                        f"hemnet_id={row['hemnet_id']} status={status} "
-                        f"address={address}"
+
+        # HTTP/2: one TLS handshake, all in-flight requests multiplexed as
+        # streams on a single connection.
+        async with httpx.AsyncClient(
+            http2=True,
+            headers={"User-Agent": "HoumGeocoder/1.0"},
+            limits=httpx.Limits(max_connections=1, max_keepalive_connections=1),
+        ) as client:
+
+            async def _work(
+                job: tuple[int, str, str, str]
+            ) -> tuple[int, str, str, float | None, float | None, str, bool]:
+                hemnet_id, address, components, address_norm = job
+                hit = cached.get(address_norm)
+                if hit is not None:
+                    return hemnet_id, address, address_norm, hit[0], hit[1], hit[2], True
+                async with sem:
+                    await limiter.wait()
+                    lat, lng, status = await _geocode(
+                        client, address, components, api_key
+                    )
+                return hemnet_id, address, address_norm, lat, lng, status, False
+
+            # Separate connections: one streams the scan, one takes the writes,
+            # so batch flushes never disturb the open cursor.
+            read_conn = await pool.acquire()
+            write_conn = await pool.acquire()
+            try:
+
+                async def _process_chunk(rows) -> None:
+                    nonlocal updated
+                    jobs = []
+                    for row in rows:
+                        address = _build_address(row)
+                        if address:
+                            components = _build_components(row)
+                            norm = _normalize_address(f"{address} {components}")
+                            jobs.append((row["hemnet_id"], address, components, norm))
+                    if not jobs:
+                        return
+
+                    # Geocode each unique normalized address once; fan the
+                    # result out to every listing that shares it.
+                    unique: dict[str, tuple[int, str, str, str]] = {}
+                    norm_ids: dict[str, list[int]] = {}
+                    for job in jobs:
+                        unique.setdefault(job[3], job)
+                        norm_ids.setdefault(job[3], []).append(job[0])
+
+                    cached.clear()
+                    records = await write_conn.fetch(
+                        """
+                        SELECT address_norm, lat, lng, status
+                        FROM geocode_cache
+                        WHERE address_norm = ANY($1);
+                        """,
+                        list(unique),
+                    )
+                    for address_norm, lat, lng, status in records:
+                        cached[address_norm] = (lat, lng, status)
+
+                    results = await asyncio.gather(
+                        *(_work(job) for job in unique.values())
                     )
-                    time.sleep(args.sleep)
-                    continue
+                    for _, address, address_norm, lat, lng, status, hit in results:
+                        # Persist only definitive outcomes; a quota blip or
+                        # auth hiccup must not blacklist the address.
+                        if not hit and status in ("OK", "ZERO_RESULTS"):
+                            new_cache.setdefault(address_norm, (lat, lng, status))
+                        if status != "OK":
+                            for hemnet_id in norm_ids[address_norm]:
+                                print(
+                                    f"hemnet_id={hemnet_id} status={status} "
+                                    f"address={address}"
+                                )
+                            continue
+
+                        for hemnet_id in norm_ids[address_norm]:
+                            print(f"hemnet_id={hemnet_id} lat={lat} lng={lng}")
+                            if not args.dry_run:
+                                buffer.append((hemnet_id, lat, lng))
+                                if len(buffer) >= args.batch_size:
+                                    updated += await _flush_updates(write_conn, buffer)
 
-                print(f"hemnet_id={row['hemnet_id']} lat={lat} lng={lng}")
-                if not args.dry_run:
-                    cur.execute(
+                async with read_conn.transaction():
+                    cursor = read_conn.cursor(
                         """
-                        UPDATE hemnet_items
-                        SET latitude = %s,
-                            longitude = %s
-                        WHERE hemnet_id = %s;
+                        SELECT hemnet_id,
+                               address,
+                               post_code,
+                               municipality_name
+                        FROM hemnet_items
+                        WHERE (latitude IS NULL OR longitude IS NULL)
+                          AND NULLIF(TRIM(COALESCE(address, '')), '') IS NOT NULL
+                        ORDER BY hemnet_id
+                        LIMIT $1;
                         """,
-                        (lat, lng, row["hemnet_id"]),
+                        args.limit,
+                        prefetch=1000,
                     )
-                    updated += 1
+                    chunk = []
+                    async for row in cursor:
+                        seen_rows = True
+                        chunk.append(row)
+                        if len(chunk) >= 1000:
+                            await _process_chunk(chunk)
+                            chunk = []
+                    if chunk:
+                        await _process_chunk(chunk)
 
-                time.sleep(args.sleep)
+                if not args.dry_run and buffer:
+                    updated += await _flush_updates(write_conn, buffer)
 
-        if not args.dry_run:
-            conn.commit()
+                if not args.dry_run and new_cache:
+                    await write_conn.executemany(
+                        """
+                        INSERT INTO geocode_cache (address_norm, lat, lng, status)
+                        VALUES ($1, $2, $3, $4)
+                        ON CONFLICT (address_norm) DO NOTHING;
+                        """,
+                        [(k, v[0], v[1], v[2]) for k, v in new_cache.items()],
+                    )
+            finally:
+                await pool.release(read_conn)
+                await pool.release(write_conn)
+    finally:
+        await pool.close()
+
+    if not seen_rows:
+        print("No rows to geocode.")
+        return 0
 
     print(f"Done. Updated {updated} rows.")
     return 0
 
 
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Backfill hemnet_items latitude/longitude via Google Geocoding."
+    )
+    parser.add_argument("--limit", type=int, default=100, help="Max rows to geocode.")
+    parser.add_argument(
+        "--sleep",
+        type=float,
+        default=0.2,
+        help="Minimum seconds between request starts (rate limit).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Number of in-flight geocoding requests.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=500,
+        help="Rows to buffer before each batched UPDATE.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Log geocoding results without writing to the database.",
+    )
+    args = parser.parse_args()
+    return asyncio.run(_run(args))
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -0,0 +1,7 @@
+CREATE EXTENSION IF NOT EXISTS postgis;
+
+ALTER TABLE hemnet_items
+    ADD COLUMN IF NOT EXISTS geom geometry(Point, 4326)
+    GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)) STORED;
+
+CREATE INDEX IF NOT EXISTS hemnet_items_geom_gix ON hemnet_items USING GIST (geom);
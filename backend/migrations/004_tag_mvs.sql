@@ -0,0 +1,32 @@
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_tag_districts AS
+SELECT hemnet_id,
+       jsonb_array_elements_text(COALESCE(districts, '[]'::jsonb)) AS tag
+FROM hemnet_items;
+
+CREATE INDEX IF NOT EXISTS mv_tag_districts_tag_idx ON mv_tag_districts (tag);
+CREATE INDEX IF NOT EXISTS mv_tag_districts_id_idx ON mv_tag_districts (hemnet_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_tag_labels AS
+SELECT hemnet_id,
+       COALESCE(elem->>'text', elem->>'title', elem::text) AS tag
+FROM hemnet_items,
+     LATERAL jsonb_array_elements(COALESCE(labels, '[]'::jsonb)) AS elem;
+
+CREATE INDEX IF NOT EXISTS mv_tag_labels_tag_idx ON mv_tag_labels (tag);
+CREATE INDEX IF NOT EXISTS mv_tag_labels_id_idx ON mv_tag_labels (hemnet_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_tag_relevant_amenities AS
+SELECT hemnet_id,
+       COALESCE(elem->>'title', elem->>'text', elem::text) AS tag
+FROM hemnet_items,
+     LATERAL jsonb_array_elements(COALESCE(relevant_amenities, '[]'::jsonb)) AS elem;
+
+CREATE INDEX IF NOT EXISTS mv_tag_relevant_amenities_tag_idx
+    ON mv_tag_relevant_amenities (tag);
+CREATE INDEX IF NOT EXISTS mv_tag_relevant_amenities_id_idx
+    ON mv_tag_relevant_amenities (hemnet_id);
+
+-- Refresh after each listings ingest:
+--   REFRESH MATERIALIZED VIEW mv_tag_districts;
+--   REFRESH MATERIALIZED VIEW mv_tag_labels;
+--   REFRESH MATERIALIZED VIEW mv_tag_relevant_amenities;
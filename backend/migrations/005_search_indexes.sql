@@ -0,0 +1,16 @@
+CREATE INDEX IF NOT EXISTS idx_items_bbox
+    ON hemnet_items (longitude, latitude)
+    INCLUDE (hemnet_id, price, rooms, square_meters)
+    WHERE latitude IS NOT NULL AND longitude IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_items_price
+    ON hemnet_items ((COALESCE(price, asked_price)) DESC NULLS LAST);
+
+CREATE INDEX IF NOT EXISTS idx_items_pub
+    ON hemnet_items ((COALESCE(published_at, collected_at)) DESC NULLS LAST);
+
+CREATE INDEX IF NOT EXISTS idx_items_muni
+    ON hemnet_items (municipality_name);
+
+CREATE INDEX IF NOT EXISTS idx_items_year
+    ON hemnet_items ((CASE WHEN year ~ '^[0-9]{4}$' THEN year::int END));
@@ -0,0 +1,10 @@
+-- Derive name_key in SQL so Python-side normalization and out-of-band
+-- writes (admin tools, bulk imports) can never disagree with the
+-- uniqueness constraint.
+ALTER TABLE houm_users DROP COLUMN IF EXISTS name_key;
+
+ALTER TABLE houm_users
+    ADD COLUMN IF NOT EXISTS name_key VARCHAR
+    GENERATED ALWAYS AS (lower(btrim(name))) STORED;
+
+CREATE UNIQUE INDEX IF NOT EXISTS houm_users_name_key_idx ON houm_users(name_key);
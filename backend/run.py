@@ -11,7 +11,15 @@ def main() -> None:
         sys.path.insert(0, str(root))
     host = os.getenv("HOUM_HOST", "0.0.0.0")
     port = int(os.getenv("HOUM_PORT") or os.getenv("PORT", "8000"))
-    uvicorn.run("backend.app:app", host=host, port=port)
+    uvicorn.run(
+        "backend.app:app",
+        host=host,
+        port=port,
+        loop=os.getenv("HOUM_LOOP", "uvloop"),
+        http=os.getenv("HOUM_HTTP", "httptools"),
+        workers=int(os.getenv("HOUM_WORKERS", str(max(2, os.cpu_count() or 2)))),
+        log_level=os.getenv("HOUM_LOG", "info"),
+    )
 
 
 if __name__ == "__main__":
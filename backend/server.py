@@ -1,16 +1,22 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import concurrent.futures
+import functools
 import os
 import sys
-from decimal import Decimal
+import threading
+import time
+from contextlib import contextmanager
 from typing import Any
-from urllib.parse import urlencode
-from urllib.request import Request, urlopen
 
+import httpx
+import orjson
 from mcp.server.fastmcp import FastMCP
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
+import psycopg2.pool
 
 try:
     from backend import settings
@@ -25,7 +31,9 @@ mcp = FastMCP("houm-geo")
 def _log_tool_call(name: str, payload: dict[str, Any] | None = None) -> None:
     if not LOG_TOOL_CALLS:
         return
-    details = json.dumps(payload or {}, ensure_ascii=False)
+    details = orjson.dumps(
+        payload or {}, default=str, option=orjson.OPT_NON_STR_KEYS
+    ).decode()
     print(f"[mcp] tool={name} payload={details}", file=sys.stderr, flush=True)
 
 
@@ -35,67 +43,235 @@ def _log_tool_error(name: str, exc: Exception) -> None:
     print(f"[mcp] tool_error={name} error={exc}", file=sys.stderr, flush=True)
 
 
+@functools.lru_cache(maxsize=1)
 def _require_maps_key() -> str:
+    # Memoized for the process lifetime; a missing key raises (and is not
+    # cached), so setting the env var and restarting recovers as before.
     key = os.getenv("GOOGLE_MAPS_API_KEY") or settings.GOOGLE_MAPS_API_KEY
     if not key:
         raise ValueError("Missing GOOGLE_MAPS_API_KEY.")
     return key
 
 
-def _request_json(url: str, params: dict[str, Any]) -> dict[str, Any]:
-    query = urlencode(params)
-    req = Request(
-        f"{url}?{query}",
-        headers={"User-Agent": "HoumMCP/1.0"},
-    )
-    with urlopen(req, timeout=20) as response:
-        payload = response.read().decode("utf-8")
-    return json.loads(payload)
+# Shared async client for the Google APIs: keep-alive + HTTP/2 means one
+# TLS handshake, and concurrent tool calls multiplex instead of queueing.
+_ASYNC_HTTP = httpx.AsyncClient(
+    http2=True,
+    headers={"User-Agent": "HoumMCP/1.0"},
+    limits=httpx.Limits(max_connections=100),
+    timeout=20,
+)
+
+
+async def _request_json(url: str, params: dict[str, Any]) -> dict[str, Any]:
+    resp = await _ASYNC_HTTP.get(url, params=params)
+    return resp.json()
+
+
+_POOL: psycopg2.pool.ThreadedConnectionPool | None = None
+# getconn() raises PoolError instead of blocking when the pool is empty;
+# the semaphore makes checkout wait for a free slot under contention.
+_POOL_SLOTS: threading.BoundedSemaphore | None = None
+_POOL_LOCK = threading.Lock()
+
+# Decode NUMERIC straight to float so responses are JSON-ready without a
+# Python-side tree walk over every payload.
+_DEC2FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values,
+    "DEC2FLOAT",
+    lambda value, cur: float(value) if value is not None else None,
+)
+
+
+def _get_pool() -> psycopg2.pool.ThreadedConnectionPool:
+    global _POOL, _POOL_SLOTS
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                if not settings.DATABASE_URL:
+                    raise ValueError("Missing DATABASE_URL.")
+                psycopg2.extensions.register_type(_DEC2FLOAT)
+                _POOL_SLOTS = threading.BoundedSemaphore(settings.DB_POOL_MAX)
+                _POOL = psycopg2.pool.ThreadedConnectionPool(
+                    settings.DB_POOL_MIN,
+                    settings.DB_POOL_MAX,
+                    settings.DATABASE_URL,
+                )
+    return _POOL
+
+
+# PgBouncer in transaction mode breaks session-scoped PREPARE; allow
+# turning it off via env when fronted by such a pooler.
+_DISABLE_PREPARE = os.getenv("MCP_DISABLE_PREPARE") == "1"
+
+_LISTINGS_GET_SQL = """
+    SELECT hemnet_id,
+           title,
+           address,
+           geographic_area,
+           price,
+           asked_price,
+           rooms,
+           square_meters,
+           formatted_living_area,
+           year,
+           description,
+           listing_url,
+           latitude,
+           longitude
+    FROM hemnet_items
+    WHERE hemnet_id = $1
+    LIMIT 1
+"""
+
+# json_agg folds the whole page into one value server-side, skipping
+# per-row Python dict construction for up to 1000 wide rows.
+_LISTINGS_BBOX_SQL = """
+    SELECT COALESCE(json_agg(row_to_json(t)), '[]'::json)
+    FROM (
+        SELECT hemnet_id,
+               address,
+               geographic_area,
+               price,
+               rooms,
+               square_meters,
+               latitude,
+               longitude
+        FROM hemnet_items
+        WHERE geom && ST_MakeEnvelope($1, $2, $3, $4, 4326)
+        LIMIT $5
+    ) t
+"""
+
+
+def _ensure_prepared(conn) -> None:
+    """PREPARE the hot statements once per physical connection."""
+    if _DISABLE_PREPARE or getattr(conn, "_houm_prepared", False):
+        return
+    with conn.cursor() as cur:
+        cur.execute(f"PREPARE houm_listings_get AS {_LISTINGS_GET_SQL};")
+        cur.execute(f"PREPARE houm_listings_bbox AS {_LISTINGS_BBOX_SQL};")
+    # Commit now: PREPARE is transactional, and a later rollback must not
+    # undo a statement we have already flagged as prepared.
+    conn.commit()
+    conn._houm_prepared = True
+
+
+def _prepare_search(conn, where_sql: str, order_sql: str, nparams: int) -> str:
+    """Lazily PREPARE one search plan per (filters, order) shape on this
+    connection, mirroring asyncpg's per-connection statement cache."""
+    cache = getattr(conn, "_houm_stmt_cache", None)
+    if cache is None:
+        cache = {}
+        conn._houm_stmt_cache = cache
+    key = (where_sql, order_sql)
+    name = cache.get(key)
+    if name is None:
+        sql = (
+            "SELECT hemnet_id, title, address, geographic_area, price, "
+            "asked_price, rooms, square_meters, monthly_fee, listing_url, "
+            "latitude, longitude FROM hemnet_items "
+            f"{where_sql} ORDER BY {order_sql} LIMIT %s"
+        )
+        parts = sql.split("%s")
+        sql = "".join(
+            part + (f"${idx + 1}" if idx < nparams else "")
+            for idx, part in enumerate(parts)
+        )
+        name = f"houm_search_{len(cache)}"
+        with conn.cursor() as cur:
+            cur.execute(f"PREPARE {name} AS {sql};")
+        conn.commit()
+        cache[key] = name
+    return name
 
 
-def _db_connect():
-    if not settings.DATABASE_URL:
-        raise ValueError("Missing DATABASE_URL.")
-    return psycopg2.connect(settings.DATABASE_URL)
+@contextmanager
+def _db_conn():
+    """Check a pooled connection out, committing or rolling back on exit."""
+    pool = _get_pool()
+    _POOL_SLOTS.acquire()
+    try:
+        conn = pool.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn)
+    finally:
+        _POOL_SLOTS.release()
+
+
+_YEAR_EXPR = "CASE WHEN year ~ '^[0-9]{4}$' THEN year::int END"
+
+_RANGE_SPECS = (
+    ("min_price", "max_price", "COALESCE(price, asked_price)"),
+    ("min_rooms", "max_rooms", "rooms"),
+    ("min_area", "max_area", "square_meters"),
+    ("min_year", "max_year", _YEAR_EXPR),
+    ("min_monthly_fee", "max_monthly_fee", "monthly_fee"),
+)
+
+_LIST_FILTERS = {
+    "housing_forms": "housing_form",
+    "housing_form": "housing_form",
+    "tenure": "tenure",
+    "municipalities": "municipality_name",
+    "regions": "region_name",
+    "counties": "county_name",
+    "types": "type",
+}
+
+
+def _freeze_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze_value(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze_value(v) for v in value)
+    return value
+
+
+# search_estimate rebuilds the same WHERE clause two or three times per
+# call; memoize on a frozen view of the filter dict. Cached params are
+# copied on return since callers extend them.
+_FILTER_CACHE: dict[Any, tuple[str, list[Any]]] = {}
+_FILTER_CACHE_MAX = 256
 
 
 def _build_filters(filters: dict[str, Any]) -> tuple[str, list[Any]]:
     if not filters:
         return "", []
+    try:
+        key = _freeze_value(filters)
+        hash(key)
+    except TypeError:
+        return _build_filters_uncached(filters)
+    hit = _FILTER_CACHE.get(key)
+    if hit is None:
+        if len(_FILTER_CACHE) >= _FILTER_CACHE_MAX:
+            _FILTER_CACHE.clear()
+        hit = _build_filters_uncached(filters)
+        _FILTER_CACHE[key] = hit
+    return hit[0], list(hit[1])
+
+
+def _build_filters_uncached(filters: dict[str, Any]) -> tuple[str, list[Any]]:
 
     clauses: list[str] = []
     params: list[Any] = []
-    price_expr = "COALESCE(price, asked_price)"
 
-    def _add_range(key_min: str, key_max: str, expr: str) -> None:
-        if key_min in filters and filters[key_min] is not None:
+    for key_min, key_max, expr in _RANGE_SPECS:
+        if filters.get(key_min) is not None:
             clauses.append(f"{expr} >= %s")
             params.append(filters[key_min])
-        if key_max in filters and filters[key_max] is not None:
+        if filters.get(key_max) is not None:
             clauses.append(f"{expr} <= %s")
             params.append(filters[key_max])
 
-    _add_range("min_price", "max_price", price_expr)
-    _add_range("min_rooms", "max_rooms", "rooms")
-    _add_range("min_area", "max_area", "square_meters")
-    _add_range("min_year", "max_year", "CASE WHEN year ~ '^[0-9]{4}$' THEN year::int END")
-    if "max_monthly_fee" in filters and filters["max_monthly_fee"] is not None:
-        clauses.append("monthly_fee <= %s")
-        params.append(filters["max_monthly_fee"])
-    if "min_monthly_fee" in filters and filters["min_monthly_fee"] is not None:
-        clauses.append("monthly_fee >= %s")
-        params.append(filters["min_monthly_fee"])
-
-    list_filters = {
-        "housing_forms": "housing_form",
-        "housing_form": "housing_form",
-        "tenure": "tenure",
-        "municipalities": "municipality_name",
-        "regions": "region_name",
-        "counties": "county_name",
-        "types": "type",
-    }
-    for key, column in list_filters.items():
+    for key, column in _LIST_FILTERS.items():
         value = filters.get(key)
         if isinstance(value, list) and value:
             clauses.append(f"{column} = ANY(%s)")
@@ -121,35 +297,88 @@ def _build_filters(filters: dict[str, Any]) -> tuple[str, list[Any]]:
     return "WHERE " + " AND ".join(clauses), params
 
 
+# The JSONB-backed fields read from materialized views pre-exploded to
+# (hemnet_id, tag) by migration 004 instead of LATERAL-expanding per call.
+_TAG_QUERIES: dict[str, tuple[str, str]] = {
+    "districts": ("hemnet_id, tag", "mv_tag_districts"),
+    "labels": ("hemnet_id, tag", "mv_tag_labels"),
+    "relevant_amenities": ("hemnet_id, tag", "mv_tag_relevant_amenities"),
+    "housing_form": ("hemnet_id, housing_form AS tag", "hemnet_items"),
+    "tenure": ("hemnet_id, tenure AS tag", "hemnet_items"),
+    "municipality_name": ("hemnet_id, municipality_name AS tag", "hemnet_items"),
+    "region_name": ("hemnet_id, region_name AS tag", "hemnet_items"),
+    "county_name": ("hemnet_id, county_name AS tag", "hemnet_items"),
+    "type": ("hemnet_id, type AS tag", "hemnet_items"),
+}
+
+
 def _tag_query(field: str) -> tuple[str, str]:
-    if field == "districts":
-        return (
-            "hemnet_id, jsonb_array_elements_text(COALESCE(districts, '[]'::jsonb)) AS tag",
-            "hemnet_items",
-        )
-    if field == "labels":
-        return (
-            "hemnet_id, COALESCE(elem->>'text', elem->>'title', elem::text) AS tag",
-            "hemnet_items, LATERAL jsonb_array_elements(COALESCE(labels, '[]'::jsonb)) AS elem",
-        )
-    if field == "relevant_amenities":
-        return (
-            "hemnet_id, COALESCE(elem->>'title', elem->>'text', elem::text) AS tag",
-            "hemnet_items, LATERAL jsonb_array_elements(COALESCE(relevant_amenities, '[]'::jsonb)) AS elem",
-        )
-    if field == "housing_form":
-        return ("hemnet_id, housing_form AS tag", "hemnet_items")
-    if field == "tenure":
-        return ("hemnet_id, tenure AS tag", "hemnet_items")
-    if field == "municipality_name":
-        return ("hemnet_id, municipality_name AS tag", "hemnet_items")
-    if field == "region_name":
-        return ("hemnet_id, region_name AS tag", "hemnet_items")
-    if field == "county_name":
-        return ("hemnet_id, county_name AS tag", "hemnet_items")
-    if field == "type":
-        return ("hemnet_id, type AS tag", "hemnet_items")
-    return ("", "")
+    return _TAG_QUERIES.get(field, ("", ""))
+
+
+_HARD_FILTERS = {
+    "min_price": "numeric",
+    "max_price": "numeric",
+    "min_rooms": "numeric",
+    "max_rooms": "numeric",
+    "min_area": "numeric",
+    "max_area": "numeric",
+    "min_year": "numeric",
+    "max_year": "numeric",
+    "min_monthly_fee": "numeric",
+    "max_monthly_fee": "numeric",
+    "housing_forms": "list",
+    "housing_form": "list",
+    "tenure": "list",
+    "municipalities": "list",
+    "regions": "list",
+    "counties": "list",
+    "types": "list",
+    "districts": "list",
+    "bbox": "bbox[min_lng,min_lat,max_lng,max_lat]",
+}
+_TAG_FIELDS = [
+    "housing_form",
+    "tenure",
+    "municipality_name",
+    "region_name",
+    "county_name",
+    "districts",
+    "type",
+    "labels",
+    "relevant_amenities",
+]
+_NUMERIC_FIELDS = [
+    "price",
+    "asked_price",
+    "rooms",
+    "square_meters",
+    "monthly_fee",
+    "year",
+]
+
+_COLUMNS_TTL = 300.0
+_COLUMNS_CACHE: tuple[float, list[str]] | None = None
+
+
+def _hemnet_columns() -> list[str]:
+    """Catalog introspection, cached for _COLUMNS_TTL seconds."""
+    global _COLUMNS_CACHE
+    cached = _COLUMNS_CACHE
+    if cached is not None and time.monotonic() - cached[0] < _COLUMNS_TTL:
+        return cached[1]
+    with _db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name = 'hemnet_items';
+                """
+            )
+            columns = sorted(row[0] for row in cur.fetchall())
+    _COLUMNS_CACHE = (time.monotonic(), columns)
+    return columns
 
 
 @mcp.tool(name="attributes_list")
@@ -157,85 +386,41 @@ async def attributes_list() -> dict[str, Any]:
     """List queryable attributes for hard filters and analytics."""
     _log_tool_call("attributes_list")
     try:
-        hard_filters = {
-            "min_price": "numeric",
-            "max_price": "numeric",
-            "min_rooms": "numeric",
-            "max_rooms": "numeric",
-            "min_area": "numeric",
-            "max_area": "numeric",
-            "min_year": "numeric",
-            "max_year": "numeric",
-            "min_monthly_fee": "numeric",
-            "max_monthly_fee": "numeric",
-            "housing_forms": "list",
-            "housing_form": "list",
-            "tenure": "list",
-            "municipalities": "list",
-            "regions": "list",
-            "counties": "list",
-            "types": "list",
-            "districts": "list",
-            "bbox": "bbox[min_lng,min_lat,max_lng,max_lat]",
-        }
-        tag_fields = [
-            "housing_form",
-            "tenure",
-            "municipality_name",
-            "region_name",
-            "county_name",
-            "districts",
-            "type",
-            "labels",
-            "relevant_amenities",
-        ]
-        numeric_fields = [
-            "price",
-            "asked_price",
-            "rooms",
-            "square_meters",
-            "monthly_fee",
-            "year",
-        ]
-        available_columns = []
-        with _db_connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT column_name
-                    FROM information_schema.columns
-                    WHERE table_name = 'hemnet_items';
-                    """
-                )
-                available_columns = [row[0] for row in cur.fetchall()]
-
         return {
-            "hard_filters": hard_filters,
-            "tag_fields": tag_fields,
-            "numeric_fields": numeric_fields,
-            "hemnet_items_columns": sorted(available_columns),
+            "hard_filters": _HARD_FILTERS,
+            "tag_fields": _TAG_FIELDS,
+            "numeric_fields": _NUMERIC_FIELDS,
+            "hemnet_items_columns": await asyncio.to_thread(_hemnet_columns),
         }
     except Exception as exc:
         _log_tool_error("attributes_list", exc)
         raise
 
 
-def _jsonable(value: Any) -> Any:
-    if isinstance(value, Decimal):
-        return float(value)
-    if isinstance(value, dict):
-        return {key: _jsonable(val) for key, val in value.items()}
-    if isinstance(value, list):
-        return [_jsonable(item) for item in value]
-    return value
+# Geocode responses are stable for a given address; cache them for a day
+# so repeated neighbourhood queries skip the external round trip. All
+# access happens on the event loop, so a plain dict suffices.
+_GEO_CACHE: dict[str, tuple[float, dict[str, Any]]] = {}
+_GEO_CACHE_TTL = 86400.0
+_GEO_CACHE_MAX = 10_000
 
 
-def _geocode(address: str) -> dict[str, Any]:
+async def _geocode(address: str) -> dict[str, Any]:
+    cache_key = address.strip().lower()
+    hit = _GEO_CACHE.get(cache_key)
+    now = time.monotonic()
+    if hit is not None and now - hit[0] < _GEO_CACHE_TTL:
+        return hit[1]
     key = _require_maps_key()
-    return _request_json(
+    payload = await _request_json(
         "https://maps.googleapis.com/maps/api/geocode/json",
         {"address": address, "key": key},
     )
+    if payload.get("status") in ("OK", "ZERO_RESULTS"):
+        if len(_GEO_CACHE) >= _GEO_CACHE_MAX:
+            _GEO_CACHE.clear()
+        _GEO_CACHE[cache_key] = (now, payload)
+    return payload
 
 
 @mcp.tool(name="geo_nearby")
@@ -260,22 +445,26 @@ async def geo_nearby(
     if not address:
         return {"error": "missing_address"}
 
-    geocode = _geocode(address)
+    key = _require_maps_key()
+    radius_m = min(50000, max(100, radius_m))
+    limit = min(20, max(1, limit))
+
+    geocode = await _geocode(address)
     if geocode.get("status") != "OK":
         return {"error": "geocode_failed", "status": geocode.get("status")}
 
     location = geocode["results"][0]["geometry"]["location"]
     params = {
         "location": f"{location['lat']},{location['lng']}",
-        "radius": max(100, min(radius_m, 50000)),
-        "key": _require_maps_key(),
+        "radius": radius_m,
+        "key": key,
     }
     if place_type:
         params["type"] = place_type
     if keyword:
         params["keyword"] = keyword
 
-    places = _request_json(
+    places = await _request_json(
         "https://maps.googleapis.com/maps/api/place/nearbysearch/json",
         params,
     )
@@ -283,7 +472,7 @@ async def geo_nearby(
         return {"error": "places_failed", "status": places.get("status")}
 
     results = []
-    for item in (places.get("results") or [])[: max(1, min(limit, 20))]:
+    for item in (places.get("results") or [])[:limit]:
         results.append(
             {
                 "name": item.get("name"),
@@ -322,7 +511,7 @@ async def geo_distance(
         return {"error": "missing_origin_or_destination"}
 
     key = _require_maps_key()
-    payload = _request_json(
+    payload = await _request_json(
         "https://maps.googleapis.com/maps/api/distancematrix/json",
         {
             "origins": origin,
@@ -373,28 +562,41 @@ async def listings_by_bbox(
         },
     )
     limit = max(1, min(limit, 1000))
+    # geom (migration 003) is NULL when either coordinate is, so the &&
+    # probe against the GiST index also covers the old NOT NULL filters.
+    # json_agg folds the whole page into one value server-side, skipping
+    # per-row Python dict construction for up to 1000 wide rows.
     sql = """
-        SELECT hemnet_id,
-               address,
-               geographic_area,
-               price,
-               rooms,
-               square_meters,
-               latitude,
-               longitude
-        FROM hemnet_items
-        WHERE latitude IS NOT NULL
-          AND longitude IS NOT NULL
-          AND longitude BETWEEN %s AND %s
-          AND latitude BETWEEN %s AND %s
-        LIMIT %s;
+        SELECT COALESCE(json_agg(row_to_json(t)), '[]'::json)
+        FROM (
+            SELECT hemnet_id,
+                   address,
+                   geographic_area,
+                   price,
+                   rooms,
+                   square_meters,
+                   latitude,
+                   longitude
+            FROM hemnet_items
+            WHERE geom && ST_MakeEnvelope(%s, %s, %s, %s, 4326)
+            LIMIT %s
+        ) t;
     """
-    with _db_connect() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(sql, (min_lng, max_lng, min_lat, max_lat, limit))
-            rows = cur.fetchall()
+    def _query():
+        with _db_conn() as conn:
+            with conn.cursor() as cur:
+                if _DISABLE_PREPARE:
+                    cur.execute(sql, (min_lng, min_lat, max_lng, max_lat, limit))
+                else:
+                    _ensure_prepared(conn)
+                    cur.execute(
+                        "EXECUTE houm_listings_bbox(%s, %s, %s, %s, %s);",
+                        (min_lng, min_lat, max_lng, max_lat, limit),
+                    )
+                return cur.fetchone()[0] or []
 
-    return {"count": len(rows), "listings": rows}
+    listings = await asyncio.to_thread(_query)
+    return {"count": len(listings), "listings": listings}
 
 
 @mcp.tool(name="listings_search")
@@ -426,29 +628,38 @@ async def listings_search(
         "rooms_asc": "rooms ASC NULLS LAST",
     }
     order_sql = order_map.get(order_by, order_map["price_desc"])
-    sql = f"""
-        SELECT hemnet_id,
-               title,
-               address,
-               geographic_area,
-               price,
-               asked_price,
-               rooms,
-               square_meters,
-               monthly_fee,
-               listing_url,
-               latitude,
-               longitude
-        FROM hemnet_items
-        {where_sql}
-        ORDER BY {order_sql}
-        LIMIT %s;
-    """
     params.append(limit)
-    with _db_connect() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(sql, params)
-            rows = cur.fetchall()
+
+    def _query():
+        with _db_conn() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                if _DISABLE_PREPARE:
+                    sql = f"""
+                        SELECT hemnet_id,
+                               title,
+                               address,
+                               geographic_area,
+                               price,
+                               asked_price,
+                               rooms,
+                               square_meters,
+                               monthly_fee,
+                               listing_url,
+                               latitude,
+                               longitude
+                        FROM hemnet_items
+                        {where_sql}
+                        ORDER BY {order_sql}
+                        LIMIT %s;
+                    """
+                    cur.execute(sql, params)
+                else:
+                    name = _prepare_search(conn, where_sql, order_sql, len(params))
+                    placeholders = ", ".join(["%s"] * len(params))
+                    cur.execute(f"EXECUTE {name}({placeholders});", params)
+                return cur.fetchall()
+
+    rows = await asyncio.to_thread(_query)
     return {"count": len(rows), "listings": rows}
 
 
@@ -475,15 +686,211 @@ async def listings_get(hemnet_id: int) -> dict[str, Any]:
         WHERE hemnet_id = %s
         LIMIT 1;
     """
-    with _db_connect() as conn:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(sql, (hemnet_id,))
-            row = cur.fetchone()
+    def _query():
+        with _db_conn() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                if _DISABLE_PREPARE:
+                    cur.execute(sql, (hemnet_id,))
+                else:
+                    _ensure_prepared(conn)
+                    cur.execute("EXECUTE houm_listings_get(%s);", (hemnet_id,))
+                return cur.fetchone()
+
+    row = await asyncio.to_thread(_query)
     if not row:
         return {"error": "listing_not_found", "hemnet_id": hemnet_id}
     return row
 
 
+_NUMERIC_EXPRS = {
+    "price": "COALESCE(price, asked_price)",
+    "asked_price": "asked_price",
+    "rooms": "rooms",
+    "square_meters": "square_meters",
+    "area": "square_meters",
+    "monthly_fee": "monthly_fee",
+    "year": _YEAR_EXPR,
+}
+
+
+def _search_estimate_sync(
+    hard_filters: dict[str, Any],
+    soft_prefs: dict[str, Any],
+    tag_fields: list[str],
+    numeric_fields: list[str],
+    bins: int,
+    tag_limit: int,
+) -> dict[str, Any]:
+    where_sql, params = _build_filters(hard_filters)
+    soft_where, soft_params = _build_filters(soft_prefs)
+    combined_where = ""
+    if soft_prefs:
+        combined_clauses = []
+        if where_sql:
+            combined_clauses.append(where_sql.replace("WHERE ", ""))
+        if soft_where:
+            combined_clauses.append(soft_where.replace("WHERE ", ""))
+        if combined_clauses:
+            combined_where = "WHERE " + " AND ".join(combined_clauses)
+
+    # This tool returns estimates, so use planner estimates for the counts
+    # too: reltuples for the table and EXPLAIN row estimates for the
+    # filtered sets, instead of exact O(N) COUNT(*) scans.
+    def _plan_rows(cur, where: str, plan_params: list[Any]) -> int:
+        cur.execute(
+            f"EXPLAIN (FORMAT JSON) SELECT 1 FROM hemnet_items {where};",
+            plan_params,
+        )
+        plan = cur.fetchone()[0]
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    with _db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = 'hemnet_items';"
+            )
+            row = cur.fetchone()
+            total_count = int(row[0]) if row else -1
+            if total_count < 0:
+                # Table never analyzed; fall back to the exact count once.
+                cur.execute("SELECT COUNT(*) FROM hemnet_items;")
+                total_count = cur.fetchone()[0]
+            filtered_count = (
+                _plan_rows(cur, where_sql, params) if where_sql else total_count
+            )
+            soft_match_count = None
+            if soft_prefs:
+                soft_match_count = (
+                    _plan_rows(cur, combined_where, params + soft_params)
+                    if combined_where
+                    else total_count
+                )
+
+    def _run_tag_fields(fields: list[str]) -> dict[str, dict[str, Any]]:
+        # All tag fields in one UNION ALL statement with a `field`
+        # discriminator: one round trip instead of one per field, and the
+        # filtered CTE is planned once and shared by every branch.
+        branches = []
+        branch_params: list[Any] = []
+        for field in fields:
+            select_sql, from_sql = _tag_query(field)
+            if not select_sql:
+                continue
+            branches.append(f"""
+                SELECT '{field}' AS field,
+                       (SELECT COALESCE(jsonb_agg(to_jsonb(o) ORDER BY o.count DESC), '[]'::jsonb)
+                        FROM (SELECT tag, COUNT(DISTINCT hemnet_id) AS count
+                              FROM (SELECT {select_sql} FROM {from_sql}) t
+                              WHERE tag IS NOT NULL AND tag <> ''
+                              GROUP BY tag
+                              ORDER BY count DESC
+                              LIMIT %s) o) AS overall,
+                       (SELECT COALESCE(jsonb_agg(to_jsonb(f) ORDER BY f.count DESC), '[]'::jsonb)
+                        FROM (SELECT tag, COUNT(DISTINCT t.hemnet_id) AS count
+                              FROM (SELECT {select_sql} FROM {from_sql}) t
+                              JOIN filtered fl ON fl.hemnet_id = t.hemnet_id
+                              WHERE tag IS NOT NULL AND tag <> ''
+                              GROUP BY tag
+                              ORDER BY count DESC
+                              LIMIT %s) f) AS filtered
+            """)
+            branch_params.extend([tag_limit, tag_limit])
+        if not branches:
+            return {}
+
+        tag_sql = f"""
+            WITH filtered AS (
+                SELECT hemnet_id
+                FROM hemnet_items
+                {where_sql}
+            )
+            {" UNION ALL ".join(branches)};
+        """
+        with _db_conn() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(tag_sql, params + branch_params)
+                rows = cur.fetchall()
+
+        results: dict[str, dict[str, Any]] = {}
+        for row in rows:
+            overall = row["overall"]
+            filtered = row["filtered"]
+            for item in overall:
+                item["share"] = (item["count"] / total_count) if total_count else 0
+            for item in filtered:
+                item["share"] = (item["count"] / filtered_count) if filtered_count else 0
+            results[row["field"]] = {"overall": overall, "filtered": filtered}
+        return results
+
+    def _run_numeric_field(field: str) -> tuple[str, dict[str, Any]]:
+        expr = _NUMERIC_EXPRS.get(field)
+        if not expr:
+            return field, {"error": "unsupported_field"}
+        # Stats and histogram share one scan of the filtered data.
+        numeric_sql = f"""
+            WITH data AS (
+                SELECT {expr} AS value
+                FROM hemnet_items
+                {where_sql}
+            ),
+            clean AS (SELECT value FROM data WHERE value IS NOT NULL),
+            bounds AS (
+                SELECT COUNT(*) AS count,
+                       MIN(value) AS min,
+                       MAX(value) AS max,
+                       AVG(value) AS avg,
+                       PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY value) AS p50,
+                       PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY value) AS p90
+                FROM clean
+            ),
+            hist AS (
+                SELECT width_bucket(value, b.min, b.max, %s) AS bucket,
+                       COUNT(*) AS count
+                FROM clean, bounds b
+                WHERE b.min < b.max
+                GROUP BY bucket
+            )
+            SELECT (SELECT to_jsonb(b) FROM bounds b) AS stats,
+                   (SELECT COALESCE(jsonb_agg(to_jsonb(h) ORDER BY h.bucket), '[]'::jsonb)
+                    FROM hist h) AS histogram;
+        """
+        with _db_conn() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(numeric_sql, params + [bins])
+                agg = cur.fetchone()
+        stats = agg["stats"] or {}
+        return field, {**stats, "histogram": agg["histogram"]}
+
+    # The remaining statements are independent; fan them out over pooled
+    # connections and reassemble in the caller's field order.
+    tag_stats: dict[str, Any] = {}
+    numeric_stats: dict[str, Any] = {}
+    job_count = (1 if tag_fields else 0) + len(numeric_fields)
+    workers = max(1, min(8, job_count, settings.DB_POOL_MAX - 1))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        tag_future = pool.submit(_run_tag_fields, tag_fields) if tag_fields else None
+        numeric_futures = [
+            (field, pool.submit(_run_numeric_field, field)) for field in numeric_fields
+        ]
+        if tag_future is not None:
+            tag_results = tag_future.result()
+            for field in tag_fields:
+                if field in tag_results:
+                    tag_stats[field] = tag_results[field]
+        for field, future in numeric_futures:
+            _, result = future.result()
+            numeric_stats[field] = result
+
+    return {
+        "total_count": total_count,
+        "filtered_count": filtered_count,
+        "soft_match_count": soft_match_count,
+        "counts_estimated": True,
+        "tag_prevalence": tag_stats,
+        "numeric_distributions": numeric_stats,
+    }
+
+
 @mcp.tool(name="search_estimate")
 async def search_estimate(
     hard_filters: dict[str, Any] | None = None,
@@ -518,150 +925,57 @@ async def search_estimate(
     bins = max(3, min(bins, 20))
     tag_limit = max(5, min(tag_limit, 50))
 
-    where_sql, params = _build_filters(hard_filters)
-    base_sql = f"FROM hemnet_items {where_sql}"
+    return await asyncio.to_thread(
+        _search_estimate_sync,
+        hard_filters,
+        soft_prefs,
+        tag_fields,
+        numeric_fields,
+        bins,
+        tag_limit,
+    )
 
-    with _db_connect() as conn:
-        with conn.cursor() as cur:
-            cur.execute(f"SELECT COUNT(*) {base_sql};", params)
-            filtered_count = cur.fetchone()[0]
-            cur.execute("SELECT COUNT(*) FROM hemnet_items;")
-            total_count = cur.fetchone()[0]
 
-        tag_stats: dict[str, Any] = {}
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            for field in tag_fields:
-                select_sql, from_sql = _tag_query(field)
-                if not select_sql:
-                    continue
-
-                overall_sql = f"""
-                    SELECT tag, COUNT(DISTINCT hemnet_id) AS count
-                    FROM (SELECT {select_sql} FROM {from_sql}) tags
-                    WHERE tag IS NOT NULL AND tag <> ''
-                    GROUP BY tag
-                    ORDER BY count DESC
-                    LIMIT %s;
-                """
-                cur.execute(overall_sql, (tag_limit,))
-                overall = cur.fetchall()
-                for row in overall:
-                    row["share"] = (row["count"] / total_count) if total_count else 0
-
-                filtered_sql = f"""
-                    WITH filtered AS (
-                        SELECT hemnet_id
-                        FROM hemnet_items
-                        {where_sql}
-                    )
-                    SELECT tag, COUNT(DISTINCT hemnet_id) AS count
-                    FROM (SELECT {select_sql} FROM {from_sql}) tags
-                    JOIN filtered f ON f.hemnet_id = tags.hemnet_id
-                    WHERE tag IS NOT NULL AND tag <> ''
-                    GROUP BY tag
-                    ORDER BY count DESC
-                    LIMIT %s;
-                """
-                cur.execute(filtered_sql, params + [tag_limit])
-                filtered = cur.fetchall()
-                for row in filtered:
-                    row["share"] = (row["count"] / filtered_count) if filtered_count else 0
-
-                tag_stats[field] = {
-                    "overall": overall,
-                    "filtered": filtered,
-                }
-
-        numeric_map = {
-            "price": "COALESCE(price, asked_price)",
-            "asked_price": "asked_price",
-            "rooms": "rooms",
-            "square_meters": "square_meters",
-            "area": "square_meters",
-            "monthly_fee": "monthly_fee",
-            "year": "CASE WHEN year ~ '^[0-9]{4}$' THEN year::int END",
-        }
-        numeric_stats: dict[str, Any] = {}
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            for field in numeric_fields:
-                expr = numeric_map.get(field)
-                if not expr:
-                    numeric_stats[field] = {"error": "unsupported_field"}
-                    continue
-                data_sql = f"""
-                    SELECT {expr} AS value
-                    FROM hemnet_items
-                    {where_sql}
-                """
-                stats_sql = f"""
-                    SELECT COUNT(*) AS count,
-                           MIN(value) AS min,
-                           MAX(value) AS max,
-                           AVG(value) AS avg,
-                           PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY value) AS p50,
-                           PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY value) AS p90
-                    FROM ({data_sql}) t
-                    WHERE value IS NOT NULL;
-                """
-                cur.execute(stats_sql, params)
-                stats = cur.fetchone()
-                histogram = []
-                if stats["count"] and stats["min"] is not None and stats["max"] is not None:
-                    if stats["min"] < stats["max"]:
-                        hist_sql = f"""
-                            WITH data AS (
-                                SELECT {expr} AS value
-                                FROM hemnet_items
-                                {where_sql}
-                                WHERE {expr} IS NOT NULL
-                            ),
-                            bounds AS (
-                                SELECT MIN(value) AS min_v, MAX(value) AS max_v FROM data
-                            )
-                            SELECT width_bucket(value, bounds.min_v, bounds.max_v, %s) AS bucket,
-                                   COUNT(*) AS count
-                            FROM data, bounds
-                            GROUP BY bucket
-                            ORDER BY bucket;
-                        """
-                        cur.execute(hist_sql, params + [bins])
-                        histogram = cur.fetchall()
-                numeric_stats[field] = {**stats, "histogram": histogram}
+def _mcp_workers() -> int:
+    return max(1, int(os.getenv("MCP_WORKERS", "1")))
 
-    soft_where, soft_params = _build_filters(soft_prefs)
-    soft_match_count = None
-    if soft_prefs:
-        combined_clauses = []
-        if where_sql:
-            combined_clauses.append(where_sql.replace("WHERE ", ""))
-        if soft_where:
-            combined_clauses.append(soft_where.replace("WHERE ", ""))
-        combined_where = ""
-        if combined_clauses:
-            combined_where = "WHERE " + " AND ".join(combined_clauses)
-        soft_sql = f"SELECT COUNT(*) FROM hemnet_items {combined_where};"
-        with _db_connect() as conn:
-            with conn.cursor() as cur:
-                cur.execute(soft_sql, params + soft_params)
-                soft_match_count = cur.fetchone()[0]
 
-    return _jsonable(
-        {
-            "total_count": total_count,
-            "filtered_count": filtered_count,
-            "soft_match_count": soft_match_count,
-            "tag_prevalence": tag_stats,
-            "numeric_distributions": numeric_stats,
-        }
-    )
+def http_app():
+    """ASGI factory so uvicorn workers can import the app by string."""
+    transport = os.getenv("MCP_TRANSPORT", "sse")
+    if transport == "sse":
+        return mcp.sse_app()
+    if _mcp_workers() > 1:
+        # Multi-worker only works stateless: session state lives in
+        # process memory, and the kernel load-balances follow-up requests
+        # to workers that do not hold the session.
+        mcp.settings.stateless_http = True
+    return mcp.streamable_http_app()
 
 
 def main() -> None:
     transport = os.getenv("MCP_TRANSPORT", "stdio")
-    if transport == "sse":
+    if transport in ("sse", "http", "streamable-http"):
+        import uvicorn
+
         host = os.getenv("MCP_HOST", "127.0.0.1")
         port = int(os.getenv("MCP_PORT", "8787"))
-        mcp.run(transport="sse", host=host, port=port)
+        mcp.settings.host = host
+        mcp.settings.port = port
+        workers = _mcp_workers()
+        if transport == "sse" and workers > 1:
+            # SSE has no stateless mode; its per-session message
+            # endpoint must land on the process holding the stream.
+            workers = 1
+        uvicorn.run(
+            "backend.server:http_app",
+            factory=True,
+            host=host,
+            port=port,
+            workers=workers,
+            loop=os.getenv("MCP_LOOP", "auto"),
+            http=os.getenv("MCP_HTTP", "auto"),
+        )
         return
     mcp.run(transport="stdio")
 
@@ -1,22 +1,36 @@
 from __future__ import annotations
 
+import functools
 import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 
 
-def _load_env_file(path: Path) -> None:
-    if not path.exists():
-        return
-    for line in path.read_text().splitlines():
-        line = line.strip()
+@functools.lru_cache(maxsize=8)
+def _parse_env(path_str: str, mtime_ns: int) -> tuple[tuple[str, str], ...]:
+    """Parse ``path`` once per mtime; repeated imports reuse the result."""
+    pairs: list[tuple[str, str]] = []
+    for raw in Path(path_str).read_text().splitlines():
+        line = raw.strip()
         if not line or line.startswith("#"):
             continue
         key, _, value = line.partition("=")
-        if not key or key in os.environ:
+        key = key.strip()
+        if not key:
             continue
-        os.environ[key.strip()] = value.strip().strip('"').strip("'")
+        pairs.append((key, value.strip().strip('"').strip("'")))
+    return tuple(pairs)
+
+
+def _load_env_file(path: Path) -> None:
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except OSError:
+        return
+    for key, value in _parse_env(str(path), mtime_ns):
+        if key not in os.environ:
+            os.environ[key] = value
 
 
 _env_file = os.getenv("ENV_FILE")
@@ -27,3 +41,5 @@ else:
 
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "")
 DATABASE_URL = os.getenv("DATABASE_URL", "")
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
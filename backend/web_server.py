@@ -1,103 +1,369 @@
 from __future__ import annotations
 
 import asyncio
+import atexit
+import gzip
+import hashlib
 import json
 import os
+import re
 import sys
+import threading
+from contextlib import contextmanager
 from functools import partial
 from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from urllib.parse import parse_qs, urlparse
 
+import orjson
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
 
 try:
     from backend import settings
+    from backend.agent_utils import agent_used_tool
 except ImportError:  # pragma: no cover - fallback for direct script runs
     import settings
+    from agent_utils import agent_used_tool
 
 BASE_DIR = settings.BASE_DIR
 
+# Decode json/jsonb once at the driver layer with orjson instead of a
+# per-column Python pass over each fetched row.
+psycopg2.extras.register_default_json(globally=True, loads=orjson.loads)
+psycopg2.extras.register_default_jsonb(globally=True, loads=orjson.loads)
+
+_IMAGE_CHUNK_BYTES = 64 * 1024
+_ASSISTANT_TIMEOUT = float(os.getenv("HOUM_ASSISTANT_TIMEOUT", "120"))
+
+# JSON compresses 5-10x; below this size the headers outweigh the savings.
+_COMPRESS_MIN_BYTES = 1024
+
+# Reject pathological bboxes from buggy clients before they hit the index.
+_BBOX_MAX_SPAN_DEG = 60.0
+
+# Request bodies are small JSON documents; anything larger is a client
+# bug or an attempt to pin a worker thread on a huge allocation.
+_MAX_BODY_BYTES = 64 * 1024
+
+
+class _BodyTooLarge(Exception):
+    """Raised after a 413 has been sent; unwinds the handler silently."""
+
+# /config is constant for the process lifetime; precompute the body and
+# headers once instead of serializing per request.
+_CONFIG_BODY = orjson.dumps({"googleMapsApiKey": settings.GOOGLE_MAPS_API_KEY})
+_CONFIG_STATUS = 200 if settings.GOOGLE_MAPS_API_KEY else 500
+_CONFIG_LEN = str(len(_CONFIG_BODY))
+_CONFIG_ETAG = '"{}"'.format(
+    hashlib.blake2b(_CONFIG_BODY, digest_size=8).hexdigest()
+)
+
+_LISTING_RE = re.compile(r"^/api/listings/(\d+)(?:/(image)(?:/(main|floorplan))?)?$")
+
+# Hot statements are PREPAREd once per pooled connection so each request
+# pays only EXECUTE instead of a fresh parse/plan.
+_PREPARED_SQL = {
+    # geom (migration 003) is NULL when either coordinate is, so the &&
+    # probe against the GiST index also covers the old NOT NULL filters.
+    "houm_web_points_ts": """
+        SELECT max(collected_at) FROM hemnet_items
+        WHERE geom && ST_MakeEnvelope($1, $3, $2, $4, 4326)
+    """,
+    "houm_web_points": """
+        SELECT h.hemnet_id, h.latitude, h.longitude
+        FROM hemnet_items h
+        WHERE h.geom && ST_MakeEnvelope($1, $3, $2, $4, 4326)
+        LIMIT 2000
+    """,
+    "houm_web_listing": """
+        SELECT {columns},
+               COALESCE(h.latitude, c.lattitude) AS lat,
+               COALESCE(h.longitude, c.longitude) AS lng
+        FROM hemnet_items h
+        LEFT JOIN hemnet_comp_items c ON c.hemnet_id = h.hemnet_id
+        WHERE h.hemnet_id = $1
+        LIMIT 1
+    """,
+    "houm_web_img_meta_main": """
+        SELECT md5(main_image_bytes), main_image_mime,
+               octet_length(main_image_bytes)
+        FROM hemnet_items WHERE hemnet_id = $1 LIMIT 1
+    """,
+    "houm_web_img_meta_floorplan": """
+        SELECT md5(floorplan_image_bytes), floorplan_image_mime,
+               octet_length(floorplan_image_bytes)
+        FROM hemnet_items WHERE hemnet_id = $1 LIMIT 1
+    """,
+    "houm_web_img_main": """
+        SELECT main_image_bytes
+        FROM hemnet_items WHERE hemnet_id = $1 LIMIT 1
+    """,
+    "houm_web_img_floorplan": """
+        SELECT floorplan_image_bytes
+        FROM hemnet_items WHERE hemnet_id = $1 LIMIT 1
+    """,
+}
+
+
+# The listing projection drops the blob/mime columns (multi-MB of wire
+# data pulled just to be discarded) and exposes presence booleans instead.
+_LISTING_SKIP_COLUMNS = {
+    "main_image_bytes",
+    "floorplan_image_bytes",
+    "main_image_mime",
+    "floorplan_image_mime",
+    "geom",
+}
+_LISTING_SELECT: str | None = None
+
+
+def _listing_select(conn) -> str:
+    global _LISTING_SELECT
+    if _LISTING_SELECT is None:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name = 'hemnet_items'
+                ORDER BY ordinal_position;
+                """
+            )
+            rows = cur.fetchall()
+        projected = [
+            f"h.{row[0]}" for row in rows if row[0] not in _LISTING_SKIP_COLUMNS
+        ]
+        projected.append("(h.main_image_bytes IS NOT NULL) AS has_main_image")
+        projected.append("(h.floorplan_image_bytes IS NOT NULL) AS has_floorplan")
+        _LISTING_SELECT = ", ".join(projected)
+    return _LISTING_SELECT
+
+
+def _ensure_prepared(conn) -> None:
+    if getattr(conn, "_houm_web_prepared", False):
+        return
+    listing_sql = _PREPARED_SQL["houm_web_listing"].format(
+        columns=_listing_select(conn)
+    )
+    with conn.cursor() as cur:
+        for name, statement in _PREPARED_SQL.items():
+            if name == "houm_web_listing":
+                statement = listing_sql
+            cur.execute(f"PREPARE {name} AS {statement};")
+    # PREPARE is transactional; commit now so a later rollback on this
+    # connection cannot silently undo the statements.
+    conn.commit()
+    conn._houm_web_prepared = True
+
+# Shared across handler threads: connecting per request pays a fresh
+# TCP+auth handshake to Postgres on every hit and burns max_connections
+# under burst load.
+_DB_POOL: psycopg2.pool.ThreadedConnectionPool | None = None
+# getconn() raises PoolError rather than blocking when every connection
+# is checked out; the semaphore makes handler threads queue for a slot
+# instead of failing under burst load.
+_DB_POOL_SLOTS: threading.BoundedSemaphore | None = None
+_DB_POOL_LOCK = threading.Lock()
+
+
+def _get_db_pool() -> psycopg2.pool.ThreadedConnectionPool:
+    global _DB_POOL, _DB_POOL_SLOTS
+    if _DB_POOL is None:
+        with _DB_POOL_LOCK:
+            if _DB_POOL is None:
+                if not settings.DATABASE_URL:
+                    raise RuntimeError("Missing DATABASE_URL")
+                pool_max = int(os.getenv("HOUM_DB_POOL_MAX", "16"))
+                _DB_POOL_SLOTS = threading.BoundedSemaphore(pool_max)
+                _DB_POOL = psycopg2.pool.ThreadedConnectionPool(
+                    2,
+                    pool_max,
+                    settings.DATABASE_URL,
+                )
+    return _DB_POOL
+
+
+def _close_db_pool() -> None:
+    global _DB_POOL
+    with _DB_POOL_LOCK:
+        if _DB_POOL is not None:
+            _DB_POOL.closeall()
+            _DB_POOL = None
+
+
+# The assistant runs on one long-lived event loop in a background thread;
+# the MCP stdio server enters that loop once and is reused by every
+# request instead of forking a fresh interpreter per call.
+_AGENT_LOOP: asyncio.AbstractEventLoop | None = None
+_AGENT_LOOP_LOCK = threading.Lock()
+_MCP_SERVER = None
+_MCP_SERVER_LOCK = asyncio.Lock()
+
+
+def _get_agent_loop() -> asyncio.AbstractEventLoop:
+    global _AGENT_LOOP
+    if _AGENT_LOOP is None:
+        with _AGENT_LOOP_LOCK:
+            if _AGENT_LOOP is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="houm-agent-loop", daemon=True
+                ).start()
+                _AGENT_LOOP = loop
+    return _AGENT_LOOP
+
+
+async def _ensure_mcp_server():
+    global _MCP_SERVER
+    if _MCP_SERVER is None:
+        async with _MCP_SERVER_LOCK:
+            if _MCP_SERVER is None:
+                from agents.mcp import MCPServerStdio
+
+                server_path = os.path.join(BASE_DIR, "backend", "server.py")
+                server = MCPServerStdio(
+                    name="houm_mcp",
+                    params={"command": sys.executable, "args": [server_path]},
+                )
+                await server.__aenter__()
+                atexit.register(_shutdown_mcp_server)
+                _MCP_SERVER = server
+    return _MCP_SERVER
+
+
+def _shutdown_mcp_server() -> None:
+    global _MCP_SERVER
+    server, _MCP_SERVER = _MCP_SERVER, None
+    loop = _AGENT_LOOP
+    if server is None or loop is None or not loop.is_running():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(
+            server.__aexit__(None, None, None), loop
+        ).result(timeout=5)
+    except Exception:
+        pass
+
 
 class HoumHandler(SimpleHTTPRequestHandler):
+    # HTTP/1.1 keep-alive: browsers reuse one TCP connection per tab
+    # instead of a handshake per request. Safe because every response
+    # path here sets Content-Length.
+    protocol_version = "HTTP/1.1"
+
     def do_GET(self) -> None:
         parsed = urlparse(self.path)
         path = parsed.path
-        query = parse_qs(parsed.query)
         if path.startswith("/.env"):
             self.send_error(404)
             return
-        if path == "/config":
-            key = settings.GOOGLE_MAPS_API_KEY
-            body = json.dumps({"googleMapsApiKey": key}).encode("utf-8")
-            self.send_response(200 if key else 500)
-            self.send_header("Content-Type", "application/json; charset=utf-8")
-            self.send_header("Cache-Control", "no-store")
-            self.send_header("Content-Length", str(len(body)))
-            self.end_headers()
-            self.wfile.write(body)
-            return
-        if path == "/api/listings/points":
-            self._handle_points(query)
+        handler = self._ROUTES_GET.get(path)
+        if handler is not None:
+            # parse_qs only runs for routed API paths, not static files.
+            handler(self, parse_qs(parsed.query))
             return
-        if path == "/api/profile":
-            self._handle_profile_get(query)
+        match = _LISTING_RE.match(path)
+        if match is not None:
+            hemnet_id, image, image_type = match.groups()
+            if image:
+                self._handle_image(hemnet_id, image_type or "main")
+            else:
+                self._handle_listing(hemnet_id)
             return
-        if path == "/api/favorites":
-            self._handle_favorites_get(query)
-            return
-        if path.startswith("/api/listings/"):
-            tail = path.split("/api/listings/", 1)[1]
-            parts = [p for p in tail.split("/") if p]
-            if len(parts) == 2 and parts[1] == "image":
-                self._handle_image(parts[0], "main")
-                return
-            if len(parts) == 3 and parts[1] == "image":
-                self._handle_image(parts[0], parts[2])
-                return
-            if len(parts) == 1:
-                self._handle_listing(parts[0])
-                return
         super().do_GET()
 
     def do_POST(self) -> None:
-        parsed = urlparse(self.path)
-        path = parsed.path
-        if path == "/api/assistant":
-            self._handle_assistant()
-            return
-        if path == "/api/profile":
-            self._handle_profile_upsert()
-            return
-        if path == "/api/favorites":
-            self._handle_favorites_add()
+        handler = self._ROUTES_POST.get(urlparse(self.path).path)
+        if handler is None:
+            self.send_error(404)
             return
-        self.send_error(404)
+        try:
+            handler(self)
+        except _BodyTooLarge:
+            pass
 
     def do_DELETE(self) -> None:
-        parsed = urlparse(self.path)
-        path = parsed.path
-        if path == "/api/favorites":
-            self._handle_favorites_remove()
+        handler = self._ROUTES_DELETE.get(urlparse(self.path).path)
+        if handler is None:
+            self.send_error(404)
             return
-        self.send_error(404)
+        try:
+            handler(self)
+        except _BodyTooLarge:
+            pass
+
+    def _serve_config(self, query) -> None:
+        if _CONFIG_STATUS != 200:
+            # Never cache the missing-key error, or clients keep failing
+            # long after the key is configured.
+            self.send_response(_CONFIG_STATUS)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("Content-Length", _CONFIG_LEN)
+            self.end_headers()
+            self.wfile.write(_CONFIG_BODY)
+            return
+        if self.headers.get("If-None-Match") == _CONFIG_ETAG:
+            self.send_response(304)
+            self.send_header("ETag", _CONFIG_ETAG)
+            self.send_header("Cache-Control", "public, max-age=60")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Cache-Control", "public, max-age=60")
+        self.send_header("ETag", _CONFIG_ETAG)
+        self.send_header("Content-Length", _CONFIG_LEN)
+        self.end_headers()
+        self.wfile.write(_CONFIG_BODY)
 
+    @contextmanager
     def _db_connect(self):
-        if not settings.DATABASE_URL:
-            raise RuntimeError("Missing DATABASE_URL")
-        return psycopg2.connect(settings.DATABASE_URL)
-
-    def _send_json(self, data, status=200):
-        def _default(value):
+        pool = _get_db_pool()
+        _DB_POOL_SLOTS.acquire()
+        try:
+            conn = pool.getconn()
             try:
-                return value.isoformat()
-            except AttributeError:
-                return str(value)
-
-        body = json.dumps(data, ensure_ascii=False, default=_default).encode("utf-8")
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                pool.putconn(conn)
+        finally:
+            _DB_POOL_SLOTS.release()
+
+    def _send_json(self, data, status=200, etag=None):
+        # orjson serializes datetimes natively and returns bytes directly;
+        # default=str covers Decimal and friends, OPT_NON_STR_KEYS the
+        # int-keyed recommendation_notes maps.
+        body = orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+        encoding = None
+        if len(body) > _COMPRESS_MIN_BYTES:
+            accept = self.headers.get("Accept-Encoding", "")
+            if brotli is not None and "br" in accept:
+                body = brotli.compress(body, quality=4)
+                encoding = "br"
+            elif "gzip" in accept:
+                body = gzip.compress(body, compresslevel=5)
+                encoding = "gzip"
         self.send_response(status)
         self.send_header("Content-Type", "application/json; charset=utf-8")
-        self.send_header("Cache-Control", "no-store")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Vary", "Accept-Encoding")
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "private, max-age=30")
+        else:
+            self.send_header("Cache-Control", "no-store")
         self.send_header("Content-Length", str(len(body)))
         self.end_headers()
         self.wfile.write(body)
@@ -126,9 +392,22 @@ class HoumHandler(SimpleHTTPRequestHandler):
             length = 0
         if length <= 0:
             return None
-        raw = self.rfile.read(length)
+        if length > _MAX_BODY_BYTES:
+            # Refuse before allocating; the unread body means the
+            # connection cannot be reused.
+            self.send_error(413)
+            self.close_connection = True
+            raise _BodyTooLarge()
+        buf = bytearray(length)
+        view = memoryview(buf)
+        read = 0
+        while read < length:
+            n = self.rfile.readinto(view[read:])
+            if not n:
+                return None
+            read += n
         try:
-            return json.loads(raw.decode("utf-8"))
+            return orjson.loads(buf)
         except Exception:
             return None
 
@@ -138,15 +417,9 @@ class HoumHandler(SimpleHTTPRequestHandler):
         display_name = value.strip()
         if not display_name:
             return None, None
-        return display_name, display_name.casefold()
-
-    def _fetch_favorites(self, conn, user_id):
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT hemnet_id FROM houm_favorites WHERE user_id = %s",
-                (user_id,),
-            )
-            return [row[0] for row in cur.fetchall()]
+        # lower(), not casefold(): the key must match the generated
+        # lower(btrim(name)) column exactly.
+        return display_name, display_name.lower()
 
     def _handle_profile_get(self, query):
         name = query.get("name", [""])[0]
@@ -155,18 +428,26 @@ class HoumHandler(SimpleHTTPRequestHandler):
             self._send_json({"error": "missing_name"}, status=400)
             return
 
-        sql = "SELECT * FROM houm_users WHERE name_key = %s LIMIT 1;"
+        # Profile and favorites in one query; psycopg2 hands array_agg
+        # back as a Python list.
+        sql = """
+            SELECT u.*,
+                   COALESCE((SELECT array_agg(hemnet_id)
+                             FROM houm_favorites f
+                             WHERE f.user_id = u.id), '{}') AS favorites
+            FROM houm_users u
+            WHERE u.name_key = %s
+            LIMIT 1;
+        """
         with self._db_connect() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
                 cur.execute(sql, (name_key,))
                 row = cur.fetchone()
-            if not row:
-                self._send_json({"error": "not_found"}, status=404)
-                return
-            favorites = self._fetch_favorites(conn, row["id"])
+        if not row:
+            self._send_json({"error": "not_found"}, status=404)
+            return
 
         row.pop("name_key", None)
-        row["favorites"] = favorites
         self._send_json(row)
 
     def _handle_profile_upsert(self):
@@ -208,49 +489,49 @@ class HoumHandler(SimpleHTTPRequestHandler):
             "districts",
         }
 
+        # Preference columns ride inside the INSERT itself: EXCLUDED
+        # carries them on conflict, so both the fresh-insert and the
+        # existing-row path apply them in a single statement. A separate
+        # UPDATE CTE would share the statement snapshot and never see the
+        # row the INSERT creates. Column names come only from
+        # preference_map, so interpolating them is safe.
+        columns = ["name"]
+        values = [display_name]
+        set_clauses = ["name = EXCLUDED.name"]
+        for key, column in preference_map.items():
+            if key not in preferences:
+                continue
+            value = preferences[key]
+            if column in json_columns:
+                value = psycopg2.extras.Json(value)
+            columns.append(column)
+            values.append(value)
+            set_clauses.append(f"{column} = EXCLUDED.{column}")
+        set_clauses.append("updated_at = NOW()")
+
+        placeholders = ", ".join(["%s"] * len(values))
+        sql = f"""
+            WITH up AS (
+                INSERT INTO houm_users ({", ".join(columns)})
+                VALUES ({placeholders})
+                ON CONFLICT (name_key)
+                DO UPDATE SET {", ".join(set_clauses)}
+                RETURNING *
+            )
+            SELECT up.*,
+                   COALESCE((SELECT array_agg(hemnet_id)
+                             FROM houm_favorites f
+                             WHERE f.user_id = up.id), '{{}}') AS favorites
+            FROM up;
+        """
+        params = values
+
         with self._db_connect() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                cur.execute(
-                    """
-                    INSERT INTO houm_users (name, name_key)
-                    VALUES (%s, %s)
-                    ON CONFLICT (name_key)
-                    DO UPDATE SET name = EXCLUDED.name, updated_at = NOW()
-                    RETURNING *;
-                    """,
-                    (display_name, name_key),
-                )
+                cur.execute(sql, params)
                 row = cur.fetchone()
 
-                updates = []
-                values = []
-                for key, column in preference_map.items():
-                    if key not in preferences:
-                        continue
-                    value = preferences[key]
-                    if column in json_columns:
-                        value = psycopg2.extras.Json(value)
-                    updates.append(f"{column} = %s")
-                    values.append(value)
-
-                if updates:
-                    updates.append("updated_at = NOW()")
-                    values.append(row["id"])
-                    cur.execute(
-                        f"""
-                        UPDATE houm_users
-                        SET {", ".join(updates)}
-                        WHERE id = %s
-                        RETURNING *;
-                        """,
-                        values,
-                    )
-                    row = cur.fetchone()
-
-            favorites = self._fetch_favorites(conn, row["id"])
-
         row.pop("name_key", None)
-        row["favorites"] = favorites
         self._send_json(row)
 
     def _handle_favorites_get(self, query):
@@ -260,17 +541,23 @@ class HoumHandler(SimpleHTTPRequestHandler):
             self._send_json({"error": "missing_name"}, status=400)
             return
 
-        sql = "SELECT id FROM houm_users WHERE name_key = %s LIMIT 1;"
+        sql = """
+            SELECT COALESCE((SELECT array_agg(hemnet_id)
+                             FROM houm_favorites f
+                             WHERE f.user_id = u.id), '{}')
+            FROM houm_users u
+            WHERE u.name_key = %s
+            LIMIT 1;
+        """
         with self._db_connect() as conn:
             with conn.cursor() as cur:
                 cur.execute(sql, (name_key,))
                 row = cur.fetchone()
-                if not row:
-                    self._send_json({"error": "not_found"}, status=404)
-                    return
-                favorites = self._fetch_favorites(conn, row[0])
+        if not row:
+            self._send_json({"error": "not_found"}, status=404)
+            return
 
-        self._send_json({"name": display_name, "favorites": favorites})
+        self._send_json({"name": display_name, "favorites": row[0]})
 
     def _handle_favorites_add(self):
         payload = self._read_json_body() or {}
@@ -286,28 +573,32 @@ class HoumHandler(SimpleHTTPRequestHandler):
                 self._send_json({"error": "invalid_hemnet_id"}, status=400)
                 return
 
+        # Upsert the user, add the favorite and read the list in one round
+        # trip. The outer SELECT runs on the statement snapshot and cannot
+        # see the row the ins CTE writes, so the new id is appended below.
+        sql = """
+            WITH up AS (
+                INSERT INTO houm_users (name)
+                VALUES (%s)
+                ON CONFLICT (name_key)
+                DO UPDATE SET name = EXCLUDED.name, updated_at = NOW()
+                RETURNING id
+            ),
+            ins AS (
+                INSERT INTO houm_favorites (user_id, hemnet_id)
+                SELECT id, %s FROM up
+                ON CONFLICT DO NOTHING
+            )
+            SELECT COALESCE((SELECT array_agg(hemnet_id)
+                             FROM houm_favorites f
+                             WHERE f.user_id = (SELECT id FROM up)), '{}');
+        """
         with self._db_connect() as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO houm_users (name, name_key)
-                    VALUES (%s, %s)
-                    ON CONFLICT (name_key)
-                    DO UPDATE SET name = EXCLUDED.name, updated_at = NOW()
-                    RETURNING id;
-                    """,
-                    (display_name, name_key),
-                )
-                user_id = cur.fetchone()[0]
-                cur.execute(
-                    """
-                    INSERT INTO houm_favorites (user_id, hemnet_id)
-                    VALUES (%s, %s)
-                    ON CONFLICT DO NOTHING;
-                    """,
-                    (user_id, hemnet_id),
-                )
-                favorites = self._fetch_favorites(conn, user_id)
+                cur.execute(sql, (display_name, hemnet_id))
+                favorites = cur.fetchone()[0]
+        if hemnet_id not in favorites:
+            favorites.append(hemnet_id)
 
         self._send_json({"name": display_name, "favorites": favorites})
 
@@ -325,22 +616,31 @@ class HoumHandler(SimpleHTTPRequestHandler):
                 self._send_json({"error": "invalid_hemnet_id"}, status=400)
                 return
 
+        # Lookup, delete and list in one statement; the snapshot still
+        # contains the deleted row, so it is filtered out below.
+        sql = """
+            WITH u AS (
+                SELECT id FROM houm_users WHERE name_key = %s LIMIT 1
+            ),
+            del AS (
+                DELETE FROM houm_favorites f
+                USING u
+                WHERE f.user_id = u.id AND f.hemnet_id = %s
+            )
+            SELECT u.id,
+                   COALESCE((SELECT array_agg(hemnet_id)
+                             FROM houm_favorites f
+                             WHERE f.user_id = u.id), '{}')
+            FROM u;
+        """
         with self._db_connect() as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    "SELECT id FROM houm_users WHERE name_key = %s LIMIT 1;",
-                    (name_key,),
-                )
+                cur.execute(sql, (name_key, hemnet_id))
                 row = cur.fetchone()
-                if not row:
-                    self._send_json({"error": "not_found"}, status=404)
-                    return
-                user_id = row[0]
-                cur.execute(
-                    "DELETE FROM houm_favorites WHERE user_id = %s AND hemnet_id = %s;",
-                    (user_id, hemnet_id),
-                )
-                favorites = self._fetch_favorites(conn, user_id)
+        if not row:
+            self._send_json({"error": "not_found"}, status=404)
+            return
+        favorites = [item for item in row[1] if item != hemnet_id]
 
         self._send_json({"name": display_name, "favorites": favorites})
 
@@ -358,7 +658,10 @@ class HoumHandler(SimpleHTTPRequestHandler):
 
         prompt = self._build_prompt(history, message.strip(), context)
         try:
-            reply = asyncio.run(self._run_agent(prompt))
+            future = asyncio.run_coroutine_threadsafe(
+                self._run_agent(prompt), _get_agent_loop()
+            )
+            reply = future.result(timeout=_ASSISTANT_TIMEOUT)
         except Exception as exc:
             self._send_json({"error": "assistant_failed", "detail": str(exc)}, status=500)
             return
@@ -376,6 +679,10 @@ class HoumHandler(SimpleHTTPRequestHandler):
     def _agent_instructions_path(self):
         return os.path.join(BASE_DIR, "backend", "agent_instruct.txt")
 
+    # Instructions cache keyed on (path, mtime_ns): re-read only when the
+    # file is edited instead of on every assistant request.
+    _instructions_cache: dict[tuple[str, int], str] = {}
+
     def _load_agent_instructions(self):
         default = (
             "You are a Houm assistant. You MUST use MCP tools before answering.\n"
@@ -385,14 +692,22 @@ class HoumHandler(SimpleHTTPRequestHandler):
             "Keep responses concise and actionable."
         )
         path = self._agent_instructions_path()
+        try:
+            cache_key = (path, os.stat(path).st_mtime_ns)
+        except OSError:
+            return default
+        cached = self._instructions_cache.get(cache_key)
+        if cached is not None:
+            return cached
         try:
             with open(path, "r", encoding="utf-8") as handle:
                 content = handle.read().strip()
-        except FileNotFoundError:
-            return default
         except OSError:
             return default
-        return content or default
+        content = content or default
+        self._instructions_cache.clear()
+        self._instructions_cache[cache_key] = content
+        return content
 
     def _build_prompt(self, history, message, context=None):
         lines = []
@@ -458,87 +773,71 @@ class HoumHandler(SimpleHTTPRequestHandler):
         return message or reply, recommended_ids, recommendation_notes
 
     def _agent_used_tool(self, result) -> bool:
-        def _scan(value) -> bool:
-            if isinstance(value, dict):
-                item_type = str(value.get("type", ""))
-                if "tool" in item_type:
-                    return True
-                if "tool_name" in value or (value.get("name") and "arguments" in value):
-                    return True
-                return any(_scan(v) for v in value.values())
-            if isinstance(value, (list, tuple)):
-                return any(_scan(v) for v in value)
-            item_type = getattr(value, "type", "")
-            if isinstance(item_type, str) and "tool" in item_type:
-                return True
-            if hasattr(value, "name") and hasattr(value, "arguments"):
-                return True
-            return False
-
-        for attr in ("new_items", "items", "output", "events", "trace"):
-            if _scan(getattr(result, attr, None)):
-                return True
-        return False
+        return agent_used_tool(result)
+
+    # Agent instances keyed on their instructions text, so the constructor
+    # work amortizes and an instructions edit still builds a fresh agent.
+    _agent_cache: dict[str, object] = {}
 
     async def _run_agent(self, prompt: str) -> str:
         from agents import Agent, Runner
-        from agents.mcp import MCPServerStdio
 
-        server_path = os.path.join(BASE_DIR, "backend", "server.py")
-        async with MCPServerStdio(
-            name="houm_mcp",
-            params={"command": sys.executable, "args": [server_path]},
-        ) as mcp_server:
+        mcp_server = await _ensure_mcp_server()
+        instructions = self._load_agent_instructions()
+        agent = self._agent_cache.get(instructions)
+        if agent is None:
             try:
                 agent = Agent(
                     name="SearchAgent",
-                    instructions=self._load_agent_instructions(),
+                    instructions=instructions,
                     mcp_servers=[mcp_server],
                 )
             except TypeError:
                 agent = Agent(
                     name="SearchAgent",
-                    instructions=self._load_agent_instructions(),
+                    instructions=instructions,
                 )
+            self._agent_cache.clear()
+            self._agent_cache[instructions] = agent
+        try:
+            result = await Runner.run(
+                agent,
+                prompt,
+                tool_choice="required",
+                mcp_servers=[mcp_server],
+            )
+        except TypeError:
+            try:
+                result = await Runner.run(agent, prompt, mcp_servers=[mcp_server])
+            except TypeError:
+                result = await Runner.run(agent, prompt)
+        if not self._agent_used_tool(result):
+            forced_prompt = (
+                prompt
+                + "\n\nIMPORTANT: You must call at least one MCP tool before "
+                "answering. If you cannot, reply with: TOOL_UNAVAILABLE."
+            )
             try:
                 result = await Runner.run(
                     agent,
-                    prompt,
+                    forced_prompt,
                     tool_choice="required",
                     mcp_servers=[mcp_server],
                 )
             except TypeError:
-                try:
-                    result = await Runner.run(agent, prompt, mcp_servers=[mcp_server])
-                except TypeError:
-                    result = await Runner.run(agent, prompt)
-            if not self._agent_used_tool(result):
-                forced_prompt = (
-                    prompt
-                    + "\n\nIMPORTANT: You must call at least one MCP tool before "
-                    "answering. If you cannot, reply with: TOOL_UNAVAILABLE."
-                )
                 try:
                     result = await Runner.run(
                         agent,
                         forced_prompt,
-                        tool_choice="required",
                         mcp_servers=[mcp_server],
                     )
                 except TypeError:
-                    try:
-                        result = await Runner.run(
-                            agent,
-                            forced_prompt,
-                            mcp_servers=[mcp_server],
-                        )
-                    except TypeError:
-                        result = await Runner.run(agent, forced_prompt)
-                if not self._agent_used_tool(result):
-                    return (
-                        "I could not access verified tool data. "
-                        "Please try again once the MCP tools are available."
-                    )
+                    result = await Runner.run(agent, forced_prompt)
+            if not self._agent_used_tool(result):
+                return (
+                    "I could not access verified tool data. "
+                    "Please try again once the MCP tools are available."
+                )
         return result.final_output or ""
 
 
@@ -556,7 +855,7 @@ class HoumHandler(SimpleHTTPRequestHandler):
         return None
 
     def _select_image_url(self, listing):
-        if listing.get("main_image_bytes"):
+        if listing.get("has_main_image"):
             return f"/api/listings/{listing['hemnet_id']}/image/main"
 
         if listing.get("main_image_url"):
@@ -583,85 +882,71 @@ class HoumHandler(SimpleHTTPRequestHandler):
         except Exception:
             self._send_json({"error": "invalid_bbox"}, status=400)
             return
+        min_lng, max_lng = max(min_lng, -180.0), min(max_lng, 180.0)
+        min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+        if (
+            min_lng > max_lng
+            or min_lat > max_lat
+            or max_lng - min_lng > _BBOX_MAX_SPAN_DEG
+            or max_lat - min_lat > _BBOX_MAX_SPAN_DEG
+        ):
+            self._send_json({"error": "invalid_bbox"}, status=400)
+            return
 
-        sql = """
-            SELECT h.hemnet_id, h.latitude AS lat, h.longitude AS lng
-            FROM hemnet_items h
-            WHERE h.latitude IS NOT NULL
-              AND h.longitude IS NOT NULL
-              AND h.longitude BETWEEN %s AND %s
-              AND h.latitude BETWEEN %s AND %s
-            LIMIT 2000;
-        """
         with self._db_connect() as conn:
-            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                cur.execute(sql, (min_lng, max_lng, min_lat, max_lat))
+            _ensure_prepared(conn)
+            with conn.cursor() as cur:
+                # Map UIs revisit the same bboxes constantly; a cheap
+                # max(collected_at) probe lets unchanged views answer 304
+                # without the scan or the JSON build.
+                cur.execute(
+                    "EXECUTE houm_web_points_ts(%s, %s, %s, %s);",
+                    (min_lng, max_lng, min_lat, max_lat),
+                )
+                max_ts = cur.fetchone()[0]
+                etag = '"{}"'.format(
+                    hashlib.blake2b(
+                        f"{bbox}:{max_ts}".encode("utf-8"), digest_size=8
+                    ).hexdigest()
+                )
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Cache-Control", "private, max-age=30")
+                    self.end_headers()
+                    return
+            with conn.cursor() as cur:
+                cur.execute(
+                    "EXECUTE houm_web_points(%s, %s, %s, %s);",
+                    (min_lng, max_lng, min_lat, max_lat),
+                )
                 rows = cur.fetchall()
 
+        # Plain tuples: the query already filters NULLs and hemnet_id is
+        # the key, so each row becomes exactly one dict.
         points = [
-            {"hemnet_id": row["hemnet_id"], "lat": row["lat"], "lng": row["lng"]}
-            for row in rows
-            if row.get("hemnet_id") is not None
+            {"hemnet_id": row[0], "lat": row[1], "lng": row[2]} for row in rows
         ]
-        self._send_json({"points": points, "count": len(points)})
+        self._send_json({"points": points, "count": len(points)}, etag=etag)
 
     def _handle_listing(self, hemnet_id):
         if not hemnet_id.isdigit():
             self._send_json({"error": "invalid_id"}, status=400)
             return
 
-        sql = """
-            SELECT h.*,
-                   COALESCE(h.latitude, c.lattitude) AS lat,
-                   COALESCE(h.longitude, c.longitude) AS lng
-            FROM hemnet_items h
-            LEFT JOIN hemnet_comp_items c ON c.hemnet_id = h.hemnet_id
-            WHERE h.hemnet_id = %s
-            LIMIT 1;
-        """
         with self._db_connect() as conn:
+            _ensure_prepared(conn)
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                cur.execute(sql, (hemnet_id,))
+                cur.execute("EXECUTE houm_web_listing(%s);", (hemnet_id,))
                 row = cur.fetchone()
 
         if not row:
             self._send_json({"error": "not_found"}, status=404)
             return
 
-        for key in [
-            "districts",
-            "labels",
-            "relevant_amenities",
-            "listing_collection_ids",
-            "breadcrumbs",
-            "ad_targeting",
-            "attachments",
-            "images",
-            "images_preview",
-            "thumbnail",
-            "photo_attribution",
-            "price_change",
-            "upcoming_open_houses",
-            "floor_plan_images",
-            "video_attachment",
-            "three_d_attachment",
-            "energy_classification",
-            "active_package",
-            "seller_package_recommendation",
-            "housing_cooperative",
-            "raw_listing",
-            "raw_apollo_state",
-            "broker_raw",
-            "broker_agency_raw",
-            "verified_bidding",
-        ]:
-            row[key] = self._coerce_json(row.get(key))
-
+        # json/jsonb columns arrive parsed via the registered orjson
+        # loaders; _coerce_json remains only for values stored as text.
         row["image_url"] = self._select_image_url(row)
-        row.pop("main_image_bytes", None)
-        row.pop("floorplan_image_bytes", None)
-        row.pop("main_image_mime", None)
-        row.pop("floorplan_image_mime", None)
 
         self._send_json(row)
 
@@ -674,37 +959,86 @@ class HoumHandler(SimpleHTTPRequestHandler):
             self.send_error(404)
             return
 
-        if image_type == "main":
-            columns = "main_image_bytes, main_image_mime"
-        else:
-            columns = "floorplan_image_bytes, floorplan_image_mime"
-
-        sql = f"SELECT {columns} FROM hemnet_items WHERE hemnet_id = %s LIMIT 1;"
+        client_etag = self.headers.get("If-None-Match")
         with self._db_connect() as conn:
+            _ensure_prepared(conn)
             with conn.cursor() as cur:
-                cur.execute(sql, (hemnet_id,))
+                # Metadata first: hash, mime and size without pulling the
+                # bytea, so revalidation and headers cost a few bytes.
+                cur.execute(
+                    f"EXECUTE houm_web_img_meta_{image_type}(%s);",
+                    (hemnet_id,),
+                )
                 row = cur.fetchone()
+                if not row or not row[2]:
+                    self.send_error(404)
+                    return
+                digest, content_type, total = row
+                etag = f'"{digest}"'
+                if client_etag == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Cache-Control", "public, max-age=86400")
+                    self.end_headers()
+                    return
 
-        if not row or not row[0]:
-            self.send_error(404)
-            return
+                # Fetch the bytea once: per-chunk substring() would
+                # re-detoast the whole value on every round trip.
+                cur.execute(
+                    f"EXECUTE houm_web_img_{image_type}(%s);",
+                    (hemnet_id,),
+                )
+                body = cur.fetchone()[0]
 
-        data, content_type = row
+        # The connection is back in the pool before we start writing;
+        # a slow client download must not pin a pooled connection.
         self.send_response(200)
         self.send_header("Content-Type", content_type or "image/jpeg")
         self.send_header("Cache-Control", "public, max-age=86400")
-        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(total))
         self.end_headers()
-        self.wfile.write(data)
+
+        # Write in slices so one stalled socket buffers at most 64 KB
+        # per send instead of the whole image.
+        view = memoryview(body)
+        for offset in range(0, len(view), _IMAGE_CHUNK_BYTES):
+            self.wfile.write(view[offset:offset + _IMAGE_CHUNK_BYTES])
+
+    # O(1) dispatch tables; the listing/image paths go through _LISTING_RE.
+    _ROUTES_GET = {
+        "/config": _serve_config,
+        "/api/listings/points": _handle_points,
+        "/api/profile": _handle_profile_get,
+        "/api/favorites": _handle_favorites_get,
+    }
+    _ROUTES_POST = {
+        "/api/assistant": _handle_assistant,
+        "/api/profile": _handle_profile_upsert,
+        "/api/favorites": _handle_favorites_add,
+    }
+    _ROUTES_DELETE = {
+        "/api/favorites": _handle_favorites_remove,
+    }
+
+
+class HoumServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Default listen backlog is 5; bursts of map-tile requests overflow it
+    # and clients see connection resets instead of queueing briefly.
+    request_queue_size = 128
 
 
 def main() -> None:
     host = os.getenv("HOUM_HOST", "127.0.0.1")
     port = int(os.getenv("HOUM_PORT") or os.getenv("PORT", "8000"))
     handler = partial(HoumHandler, directory=str(BASE_DIR))
-    server = ThreadingHTTPServer((host, port), handler)
+    server = HoumServer((host, port), handler)
     print(f"Houm server running at http://{host}:{port}")
-    server.serve_forever()
+    try:
+        server.serve_forever()
+    finally:
+        _close_db_pool()
 
 
 if __name__ == "__main__":
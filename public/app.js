@@ -475,10 +475,19 @@ function updateRecommendationNotes(hemnetId) {
   });
 }
 
-function setPoints(points) {
-  listingPoints = Array.isArray(points)
-    ? points.filter((point) => point && point.lat && point.lng)
-    : [];
+function setPoints(data) {
+  let points = [];
+  if (Array.isArray(data)) {
+    points = data;
+  } else if (data && Array.isArray(data.hemnet_id)) {
+    // Columnar payload: parallel hemnet_id/lat/lng arrays.
+    points = data.hemnet_id.map((id, i) => ({
+      hemnet_id: id,
+      lat: data.lat[i],
+      lng: data.lng[i],
+    }));
+  }
+  listingPoints = points.filter((point) => point && point.lat && point.lng);
   renderMarkers();
   if (!activeListingId && listingPoints.length > 0) {
     selectListing(listingPoints[0].hemnet_id, { pan: false });
@@ -582,7 +591,7 @@ async function loadPointsForMap() {
       throw new Error("Points request failed.");
     }
     const data = await response.json();
-    setPoints(data.points || []);
+    setPoints(data.points || data);
   } catch (error) {
     showMapError("Listings are unavailable. Check the database connection.");
     console.warn("Points load failed:", error);